@@ -16,11 +16,775 @@ import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 import os
+import io
+import copy
+import json
+import gzip
+import pickle
+import tarfile
+import tempfile
+import shutil
+import argparse
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import hashlib
+import heapq
+import html as html_lib
+from urllib.parse import quote
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 warnings.filterwarnings('ignore')
 
+# Bump when the cache bundle layout changes; older bundles are then ignored
+CACHE_BUNDLE_VERSION = 1
+
+# Supported storage precisions for prices, panels and indicator arrays
+PRICE_DTYPES = ('float64', 'float32')
+
+# Process umask, read once at import (os.umask can only be read by setting it)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+# Alert rules used when no alert_rules.json is present
+DEFAULT_ALERT_RULES = [
+    {'id': 'cross_above_sma200', 'type': 'cross_above', 'field': 'Price', 'ref': 'SMA_200',
+     'message': '{Name} crossed above its 200-day SMA (₹{Price:,.0f})'},
+    {'id': 'cross_below_sma200', 'type': 'cross_below', 'field': 'Price', 'ref': 'SMA_200',
+     'message': '{Name} fell below its 200-day SMA (₹{Price:,.0f})'},
+    {'id': 'rsi_oversold', 'type': 'cross_below', 'field': 'RSI', 'value': 30,
+     'message': '{Name} RSI dropped under 30 ({RSI:.0f})'},
+    {'id': 'hold_to_buy', 'type': 'change', 'field': 'Recommendation',
+     'from': ['HOLD', 'SELL', 'STRONG SELL'], 'to': ['BUY', 'STRONG BUY'],
+     'message': '{Name} upgraded to {Recommendation}'},
+]
+
+
+# Stylesheet shared by the full report and the compact static site
+REPORT_CSS = """
+        * {
+            margin: 0;
+            padding: 0;
+            box-sizing: border-box;
+        }
+        
+        body {
+            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            padding: 20px;
+            min-height: 100vh;
+        }
+        
+        .container {
+            max-width: 1400px;
+            margin: 0 auto;
+            background: white;
+            border-radius: 20px;
+            box-shadow: 0 20px 60px rgba(0,0,0,0.3);
+            overflow: hidden;
+        }
+        
+        .header {
+            background: linear-gradient(135deg, #1e40af 0%, #3b82f6 100%);
+            color: white;
+            padding: 40px;
+            text-align: center;
+        }
+        
+        .header h1 {
+            font-size: 42px;
+            margin-bottom: 10px;
+            text-shadow: 2px 2px 4px rgba(0,0,0,0.2);
+        }
+        
+        .header p {
+            font-size: 18px;
+            opacity: 0.9;
+        }
+        
+        .last-updated {
+            background: rgba(255,255,255,0.2);
+            padding: 10px 20px;
+            border-radius: 25px;
+            display: inline-block;
+            margin-top: 15px;
+            font-size: 14px;
+        }
+        
+        .summary-grid {
+            display: grid;
+            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
+            gap: 20px;
+            padding: 40px;
+            background: #f8f9fa;
+        }
+        
+        .summary-card {
+            background: white;
+            padding: 25px;
+            border-radius: 15px;
+            box-shadow: 0 4px 15px rgba(0,0,0,0.1);
+            text-align: center;
+            transition: transform 0.3s ease;
+        }
+        
+        .summary-card:hover {
+            transform: translateY(-5px);
+        }
+        
+        .summary-card .number {
+            font-size: 48px;
+            font-weight: bold;
+            color: #1e40af;
+            margin-bottom: 10px;
+        }
+        
+        .summary-card .label {
+            font-size: 14px;
+            color: #6b7280;
+            text-transform: uppercase;
+            letter-spacing: 1px;
+        }
+        
+        .content {
+            padding: 40px;
+        }
+        
+        .section {
+            margin-bottom: 50px;
+        }
+        
+        .section-title {
+            font-size: 32px;
+            margin-bottom: 25px;
+            padding-bottom: 15px;
+            border-bottom: 4px solid #15803d;
+            color: #15803d;
+        }
+        
+        .section-title.info {
+            border-bottom-color: #1e40af;
+            color: #1e40af;
+        }
+        
+        .section-title.alert {
+            border-bottom-color: #f59e0b;
+            color: #b45309;
+        }
+        
+        .alert-list {
+            margin-left: 25px;
+            line-height: 1.8;
+            font-size: 16px;
+        }
+        
+        .section-title.sell {
+            border-bottom-color: #dc2626;
+            color: #dc2626;
+        }
+        
+        table {
+            width: 100%;
+            border-collapse: collapse;
+            background: white;
+            border-radius: 10px;
+            overflow: hidden;
+            box-shadow: 0 4px 15px rgba(0,0,0,0.1);
+        }
+        
+        thead {
+            background: #15803d;
+            color: white;
+        }
+        
+        thead.sell {
+            background: #dc2626;
+        }
+        
+        thead.info {
+            background: #1e40af;
+        }
+        
+        th {
+            padding: 18px 15px;
+            text-align: left;
+            font-size: 13px;
+            font-weight: 600;
+            text-transform: uppercase;
+            letter-spacing: 0.5px;
+        }
+        
+        td {
+            padding: 16px 15px;
+            border-bottom: 1px solid #e5e7eb;
+        }
+        
+        tr:hover {
+            background-color: #f9fafb;
+        }
+        
+        .stock-name {
+            font-weight: 600;
+            color: #1f2937;
+        }
+        
+        .stock-name a {
+            color: inherit;
+            text-decoration: none;
+            border-bottom: 1px dotted #9ca3af;
+        }
+        
+        .rating {
+            font-weight: bold;
+            font-size: 12px;
+        }
+        
+        .upside-positive {
+            color: #15803d;
+            font-weight: bold;
+            font-size: 16px;
+        }
+        
+        .upside-negative {
+            color: #dc2626;
+            font-weight: bold;
+            font-size: 16px;
+        }
+        
+        .rsi-overbought {
+            color: #dc2626;
+            font-weight: bold;
+            font-size: 16px;
+        }
+        
+        .rsi-oversold {
+            color: #15803d;
+            font-weight: bold;
+            font-size: 16px;
+        }
+        
+        .rsi-neutral {
+            color: #f59e0b;
+            font-weight: bold;
+            font-size: 16px;
+        }
+        
+        .quality-badge {
+            padding: 6px 14px;
+            border-radius: 20px;
+            color: white;
+            font-size: 11px;
+            font-weight: bold;
+            display: inline-block;
+        }
+        
+        .cluster-badge {
+            background: #fef3c7;
+            color: #92400e;
+            border: 1px solid #f59e0b;
+            padding: 2px 8px;
+            border-radius: 10px;
+            font-size: 10px;
+            font-weight: bold;
+            margin-left: 6px;
+        }
+        
+        .quality-excellent { background: #15803d; }
+        .quality-good { background: #3b82f6; }
+        .quality-average { background: #f59e0b; }
+        .quality-poor { background: #dc2626; }
+        
+        .disclaimer {
+            background: #fef3c7;
+            border: 3px solid #f59e0b;
+            border-radius: 15px;
+            padding: 30px;
+            margin: 40px 0;
+        }
+        
+        .disclaimer h3 {
+            color: #dc2626;
+            margin-bottom: 15px;
+            font-size: 20px;
+        }
+        
+        .disclaimer ul {
+            margin-left: 25px;
+            margin-top: 15px;
+            line-height: 1.8;
+        }
+        
+        .footer {
+            background: #1f2937;
+            color: white;
+            text-align: center;
+            padding: 30px;
+        }
+        
+        .footer p {
+            margin: 5px 0;
+        }
+        
+        .toolbar {
+            display: flex;
+            gap: 12px;
+            margin-bottom: 15px;
+        }
+        
+        .toolbar input, .toolbar select {
+            padding: 10px 14px;
+            border: 1px solid #d1d5db;
+            border-radius: 8px;
+            font-size: 14px;
+        }
+        
+        .table-scroll {
+            overflow-x: auto;
+        }
+        
+        th.sortable {
+            cursor: pointer;
+            white-space: nowrap;
+        }
+        
+        th.sortable.asc::after { content: ' ▲'; }
+        th.sortable.desc::after { content: ' ▼'; }
+        
+        @media (max-width: 768px) {
+            .header h1 { font-size: 28px; }
+            .summary-grid { grid-template-columns: repeat(2, 1fr); }
+            table { font-size: 12px; }
+            th, td { padding: 10px 8px; }
+        }
+"""
+
+
+# Client-side renderer for the compact static site (reads the per-run JSON payload)
+REPORT_JS = r"""
+(function () {
+    'use strict';
+    
+    var app = document.getElementById('app');
+    
+    function el(tag, className, text) {
+        var node = document.createElement(tag);
+        if (className) { node.className = className; }
+        if (text !== undefined && text !== null) { node.textContent = text; }
+        return node;
+    }
+    
+    function stockLink(symbol, name) {
+        var link = el('a', null, name);
+        link.href = 'stocks/' + encodeURIComponent(symbol) + '.html';
+        return link;
+    }
+    
+    function renderTable(columns, rows, theme, symbols, badges) {
+        var table = el('table');
+        var thead = el('thead', theme);
+        var head = el('tr');
+        columns.forEach(function (col) { head.appendChild(el('th', null, col)); });
+        thead.appendChild(head);
+        table.appendChild(thead);
+        var tbody = el('tbody');
+        rows.forEach(function (row, i) {
+            var tr = el('tr');
+            row.forEach(function (cell, j) {
+                var td = el('td', j === 0 ? 'stock-name' : null);
+                if (j === 0 && symbols) { td.appendChild(stockLink(symbols[i], cell)); }
+                else { td.textContent = cell; }
+                if (j === 0 && badges && badges[i]) { td.appendChild(el('span', 'cluster-badge', badges[i])); }
+                tr.appendChild(td);
+            });
+            tbody.appendChild(tr);
+        });
+        table.appendChild(tbody);
+        return table;
+    }
+    
+    function renderSection(section) {
+        var wrap = el('div', 'section');
+        wrap.appendChild(el('h2', 'section-title ' + section.theme, section.title));
+        var scroll = el('div', 'table-scroll');
+        scroll.appendChild(renderTable(section.columns, section.rows, section.theme, section.symbols, section.badges));
+        wrap.appendChild(scroll);
+        if (section.note) { wrap.appendChild(el('p', null, section.note)); }
+        return wrap;
+    }
+    
+    function renderFullTable(data, container) {
+        var columns = data.columns;
+        var rows = data.rows.slice();
+        var nameCol = columns.indexOf('Name');
+        var symbolCol = columns.indexOf('Symbol');
+        var recCol = columns.indexOf('Recommendation');
+        var sortCol = columns.indexOf('Combined_Score');
+        var sortDir = -1;
+        
+        var toolbar = el('div', 'toolbar');
+        var search = el('input');
+        search.placeholder = 'Filter stocks...';
+        var select = el('select');
+        ['All', 'STRONG BUY', 'BUY', 'HOLD', 'SELL', 'STRONG SELL'].forEach(function (rec) {
+            var option = el('option', null, rec);
+            option.value = rec;
+            select.appendChild(option);
+        });
+        toolbar.appendChild(search);
+        toolbar.appendChild(select);
+        container.appendChild(toolbar);
+        
+        var scroll = el('div', 'table-scroll');
+        container.appendChild(scroll);
+        
+        function draw() {
+            var text = search.value.toLowerCase();
+            var rec = select.value;
+            var visible = rows.filter(function (row) {
+                var matches = !text || row.join(' ').toLowerCase().indexOf(text) !== -1;
+                return matches && (rec === 'All' || row[recCol] === rec);
+            });
+            visible.sort(function (a, b) {
+                var x = a[sortCol], y = b[sortCol];
+                if (x === y) { return 0; }
+                if (x === null) { return 1; }
+                if (y === null) { return -1; }
+                return (x < y ? -1 : 1) * sortDir;
+            });
+            
+            var table = el('table');
+            var thead = el('thead', 'info');
+            var head = el('tr');
+            columns.forEach(function (col, j) {
+                var th = el('th', 'sortable' + (j === sortCol ? (sortDir > 0 ? ' asc' : ' desc') : ''), col.replace(/_/g, ' '));
+                th.addEventListener('click', function () {
+                    sortDir = (j === sortCol) ? -sortDir : -1;
+                    sortCol = j;
+                    draw();
+                });
+                head.appendChild(th);
+            });
+            thead.appendChild(head);
+            table.appendChild(thead);
+            
+            var tbody = el('tbody');
+            visible.forEach(function (row) {
+                var tr = el('tr');
+                row.forEach(function (cell, j) {
+                    var td = el('td', j === nameCol ? 'stock-name' : null);
+                    if (j === nameCol) { td.appendChild(stockLink(row[symbolCol], cell)); }
+                    else { td.textContent = cell === null ? '-' : cell; }
+                    tr.appendChild(td);
+                });
+                tbody.appendChild(tr);
+            });
+            table.appendChild(tbody);
+            scroll.replaceChildren(table);
+        }
+        
+        search.addEventListener('input', draw);
+        select.addEventListener('change', draw);
+        draw();
+    }
+    
+    function render(data) {
+        var container = el('div', 'container');
+        
+        var header = el('div', 'header');
+        header.appendChild(el('h1', null, '📊 NIFTY 50 Stock Analysis'));
+        header.appendChild(el('p', null, data.time_of_day + ' Market Report'));
+        header.appendChild(el('div', 'last-updated', 'Last Updated: ' + data.updated + ' IST'));
+        container.appendChild(header);
+        
+        var summary = el('div', 'summary-grid');
+        data.summary.forEach(function (card) {
+            var box = el('div', 'summary-card');
+            box.appendChild(el('div', 'number', card[1]));
+            box.appendChild(el('div', 'label', card[0]));
+            summary.appendChild(box);
+        });
+        container.appendChild(summary);
+        
+        var content = el('div', 'content');
+        data.sections.forEach(function (section) { content.appendChild(renderSection(section)); });
+        
+        var all = el('div', 'section');
+        all.appendChild(el('h2', 'section-title info', '📋 ALL STOCKS'));
+        renderFullTable(data, all);
+        content.appendChild(all);
+        
+        var disclaimer = el('div', 'disclaimer');
+        disclaimer.appendChild(el('h3', null, '⚠️ DISCLAIMER'));
+        disclaimer.appendChild(el('p', null, 'This analysis is for EDUCATIONAL PURPOSES ONLY. This is NOT financial advice.'));
+        content.appendChild(disclaimer);
+        container.appendChild(content);
+        
+        var footer = el('div', 'footer');
+        footer.appendChild(el('p', null, '© 2025 NIFTY 50 Analyzer'));
+        footer.appendChild(el('p', null, 'Automated Stock Analysis System | Next Update: ' + data.next_update + ' IST'));
+        container.appendChild(footer);
+        
+        app.replaceChildren(container);
+    }
+    
+    fetch(app.getAttribute('data-src'))
+        .then(function (response) { return response.json(); })
+        .then(render)
+        .catch(function () { app.textContent = 'Could not load report data.'; });
+})();
+"""
+
+
+def render_svg_line_chart(series, width=900, height=260, y_min=None, y_max=None, guides=()):
+    """Render [(label, values, color), ...] as an inline SVG line chart"""
+    pad_left, pad_right, pad_y = 60, 10, 20
+    finite = [v for _, values, _ in series for v in values if v is not None]
+    if not finite:
+        return ''
+    
+    y_min = min(finite) if y_min is None else y_min
+    y_max = max(finite) if y_max is None else y_max
+    span = (y_max - y_min) or 1.0
+    n_points = max(len(values) for _, values, _ in series)
+    x_step = (width - pad_left - pad_right) / max(n_points - 1, 1)
+    
+    def y_pos(v):
+        return pad_y + (y_max - v) / span * (height - 2 * pad_y)
+    
+    parts = [f'<svg viewBox="0 0 {width} {height}" width="100%" xmlns="http://www.w3.org/2000/svg">',
+             f'<rect width="{width}" height="{height}" fill="#ffffff"/>']
+    for value in guides:
+        parts.append(f'<line x1="{pad_left}" x2="{width - pad_right}" y1="{y_pos(value):.1f}" y2="{y_pos(value):.1f}" '
+                     f'stroke="#d1d5db" stroke-dasharray="4 4"/>')
+    for value in (y_min, y_max) + tuple(guides):
+        parts.append(f'<text x="{pad_left - 6}" y="{y_pos(value) + 4:.1f}" font-size="11" text-anchor="end" '
+                     f'fill="#6b7280">{value:,.0f}</text>')
+    
+    for idx, (label, values, color) in enumerate(series):
+        # Break the line at missing values (e.g. before an SMA warms up)
+        segment = []
+        for i, v in enumerate(values + [None]):
+            if v is not None:
+                segment.append(f"{pad_left + i * x_step:.1f},{y_pos(v):.1f}")
+            elif segment:
+                parts.append(f'<polyline points="{" ".join(segment)}" fill="none" stroke="{color}" stroke-width="1.6"/>')
+                segment = []
+        parts.append(f'<text x="{pad_left + 10 + idx * 110}" y="14" font-size="12" fill="{color}">{label}</text>')
+    
+    parts.append('</svg>')
+    return ''.join(parts)
+
+
+def render_stock_page(payload):
+    """Render one stock detail page (module level so worker processes can run it)"""
+    result = payload['result']
+    chart = payload['chart']
+    name = html_lib.escape(str(result['Name']))
+    
+    price_chart = render_svg_line_chart([
+        ('Close', chart['Close'], '#1e40af'),
+        ('SMA 20', chart['SMA_20'], '#15803d'),
+        ('SMA 50', chart['SMA_50'], '#f59e0b'),
+        ('SMA 200', chart['SMA_200'], '#dc2626'),
+    ])
+    rsi_chart = render_svg_line_chart([('RSI', chart['RSI'], '#7c3aed')], height=160,
+                                      y_min=0, y_max=100, guides=(30, 70))
+    
+    rows = ''.join(
+        f"<tr><th>{html_lib.escape(str(key).replace('_', ' '))}</th><td>{html_lib.escape(str(value))}</td></tr>"
+        for key, value in result.items()
+    )
+    
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{name} - NIFTY 50 Stock Analysis</title>
+    <style>
+        body {{ font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; background: #f3f4f6; margin: 0; padding: 20px; color: #1f2937; }}
+        .container {{ max-width: 1100px; margin: 0 auto; background: white; border-radius: 20px; overflow: hidden; box-shadow: 0 10px 30px rgba(0,0,0,0.15); }}
+        .header {{ background: linear-gradient(135deg, #1e40af 0%, #3b82f6 100%); color: white; padding: 30px; }}
+        .header a {{ color: white; }}
+        .content {{ padding: 30px; }}
+        h2 {{ color: #1e40af; border-bottom: 3px solid #1e40af; padding-bottom: 8px; }}
+        table {{ width: 100%; border-collapse: collapse; }}
+        th, td {{ text-align: left; padding: 8px 12px; border-bottom: 1px solid #e5e7eb; font-size: 14px; }}
+        th {{ width: 40%; color: #6b7280; font-weight: 600; }}
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <p><a href="../index.html">← Back to report</a></p>
+            <h1>{name} ({html_lib.escape(str(result['Symbol']))})</h1>
+            <p>₹{result['Price']:,.2f} | {html_lib.escape(str(result['Rating']))} | Score {result['Combined_Score']:.0f} | Data as of {payload['as_of']}</p>
+        </div>
+        <div class="content">
+            <h2>Price &amp; Moving Averages</h2>
+            {price_chart}
+            <h2>RSI (14)</h2>
+            {rsi_chart}
+            <h2>All Metrics</h2>
+            <table>{rows}</table>
+        </div>
+    </div>
+</body>
+</html>
+"""
+
+
+class MemmapPricePanel:
+    """Fixed-layout, memory-mapped price panel for long multi-symbol histories
+    
+    Data lives in one raw file shaped (fields x symbols x dates) so each symbol's
+    series for a field is contiguous; a JSON sidecar holds dates, symbols, fields
+    and dtype. Views are returned as (dates x symbols) without copying, and only
+    the pages actually touched are read into memory.
+    """
+    
+    FIELDS = ('Open', 'High', 'Low', 'Close', 'Volume')
+    
+    def __init__(self, path, mode='r'):
+        with open(path + '.json', 'r', encoding='utf-8') as f:
+            header = json.load(f)
+        
+        self.path = path
+        self.fields = header['fields']
+        self.symbols = header['symbols']
+        self.dtype = np.dtype(header['dtype'])
+        self.dates = pd.DatetimeIndex(header['dates'])
+        self._field_idx = {field: i for i, field in enumerate(self.fields)}
+        self._symbol_idx = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.data = np.memmap(path, dtype=self.dtype, mode=mode,
+                              shape=(len(self.fields), len(self.symbols), len(self.dates)))
+    
+    @classmethod
+    def create(cls, path, dates, symbols, fields=FIELDS, dtype='float64'):
+        """Create an empty (NaN-filled) panel file and its header"""
+        dates = pd.DatetimeIndex(dates)
+        header = {
+            'version': 1,
+            'dtype': np.dtype(dtype).name,
+            'fields': list(fields),
+            'symbols': list(symbols),
+            'dates': [d.strftime('%Y-%m-%d') for d in dates],
+        }
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        data = np.memmap(path, dtype=dtype, mode='w+', shape=(len(fields), len(symbols), len(dates)))
+        data[:] = np.nan
+        data.flush()
+        del data
+        with open(path + '.json', 'w', encoding='utf-8') as f:
+            json.dump(header, f)
+        return cls(path, mode='r+')
+    
+    def write(self, symbol, df):
+        """Store one symbol's OHLCV DataFrame, aligned on the panel dates"""
+        index = pd.DatetimeIndex(df.index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        aligned = df.set_axis(index.normalize()).reindex(self.dates)
+        s = self._symbol_idx[symbol]
+        for field in self.fields:
+            if field in aligned:
+                self.data[self._field_idx[field], s, :] = aligned[field].to_numpy(dtype=self.dtype)
+    
+    def view(self, field, start=0, stop=None):
+        """Zero-copy (dates x symbols) view of a contiguous range of symbols"""
+        return self.data[self._field_idx[field], start:stop, :].T
+    
+    def iter_chunks(self, fields=FIELDS, chunk_size=64):
+        """Yield (symbols, {field: view}) over column chunks of the panel"""
+        for start in range(0, len(self.symbols), chunk_size):
+            stop = min(start + chunk_size, len(self.symbols))
+            yield self.symbols[start:stop], {field: self.view(field, start, stop) for field in fields}
+    
+    def to_frame(self, field, symbols=None):
+        """Copy a field into a (dates x symbols) DataFrame"""
+        if symbols is None:
+            return pd.DataFrame(np.asarray(self.view(field)), index=self.dates, columns=self.symbols)
+        cols = [self._symbol_idx[symbol] for symbol in symbols]
+        values = self.data[self._field_idx[field]][cols].T
+        return pd.DataFrame(values, index=self.dates, columns=symbols)
+    
+    def flush(self):
+        """Flush pending writes to disk"""
+        self.data.flush()
+
+
+class StreamingTopK:
+    """Bounded top-k buy and sell heaps fed one result at a time
+    
+    Each result is offered once as it arrives, so a ranking is available at any
+    point of the run. Ties on score keep the earlier result, matching
+    DataFrame.nlargest / nsmallest with keep='first'; once every result has been
+    pushed the ranking equals a full sort.
+    """
+    
+    BUY = ('STRONG BUY', 'BUY')
+    SELL = ('STRONG SELL', 'SELL')
+    
+    def __init__(self, k=10, key='Combined_Score'):
+        self.k = k
+        self.key = key
+        self.count = 0
+        self._buys = []
+        self._sells = []
+    
+    def push(self, result):
+        """Offer one result; returns its arrival sequence number"""
+        seq = self.count
+        self.count += 1
+        score = result.get(self.key)
+        if score is None or pd.isna(score):
+            return seq
+        
+        # Heap roots hold the weakest kept entry; later arrivals lose ties
+        if result['Recommendation'] in self.BUY:
+            self._offer(self._buys, (score, -seq), seq, result)
+        elif result['Recommendation'] in self.SELL:
+            self._offer(self._sells, (-score, -seq), seq, result)
+        return seq
+    
+    def extend(self, results):
+        """Push a batch of results in order"""
+        for result in results:
+            self.push(result)
+    
+    def _offer(self, heap, rank, seq, result):
+        if len(heap) < self.k:
+            heapq.heappush(heap, (rank, seq, result))
+        elif rank > heap[0][0]:
+            heapq.heapreplace(heap, (rank, seq, result))
+    
+    def top_buys(self):
+        """(seq, result) pairs, highest score first"""
+        return [(seq, result) for _, seq, result in sorted(self._buys, key=lambda item: item[0], reverse=True)]
+    
+    def top_sells(self):
+        """(seq, result) pairs, lowest score first"""
+        return [(seq, result) for _, seq, result in sorted(self._sells, key=lambda item: item[0], reverse=True)]
+
 
 class Nifty50CompleteAnalyzer:
+    # Order in which shared email fragments make up the full report email
+    EMAIL_SECTIONS = ('header', 'alerts', 'data_quality', 'top_lists', 'market', 'footer')
+    
+    # Per-symbol scoring inputs stored for what-if rescoring
+    FEATURE_COLUMNS = ('Price', 'Support', 'Resistance', 'Target_Price', 'Fund_Score', 'Tech_Core',
+                       'MTF_Points', 'Ext_Points', 'Relative_Points', 'Has_Relative', 'Quarantined')
+    
+    # (rating, recommendation) from the highest cutoff down
+    RATINGS = (("⭐⭐⭐⭐⭐ STRONG BUY", "STRONG BUY"), ("⭐⭐⭐⭐ BUY", "BUY"), ("⭐⭐⭐ HOLD", "HOLD"),
+               ("⭐⭐ SELL", "SELL"), ("⭐ STRONG SELL", "STRONG SELL"))
+    
     def __init__(self):
         # Nifty 50 stock symbols
         self.nifty50_stocks = {
@@ -76,7 +840,99 @@ class Nifty50CompleteAnalyzer:
             'ADANIENT.NS': 'Adani Enterprises'
         }
         
-        self.results = []
+        self.results = []
+        self.ranker = StreamingTopK(k=10)
+        
+        # Local cache directory (fundamentals, sector metadata, run journals)
+        self.cache_dir = os.environ.get('NIFTY_CACHE_DIR', '.cache')
+        self.fundamentals_cache = None
+        
+        # Portable bundle of the caches for fresh CI runners (empty disables it)
+        self.cache_bundle_path = os.environ.get('NIFTY_CACHE_BUNDLE',
+                                                os.path.join(self.cache_dir, 'cache_bundle.tar.gz'))
+        
+        # Per-stock detail pages (bundled too, so a fresh checkout rebuilds incrementally)
+        self.stock_pages_dir = 'stocks'
+        
+        # Run id for checkpoint/resume: same id resumes an interrupted run
+        self.run_id = self._default_run_id()
+        
+        # Price history and fundamentals per symbol (kept for universe-wide stages)
+        self.price_data = {}
+        self.fundamentals = {}
+        
+        # Cached bars are refetched in full at least this often (catches missed back-adjustments)
+        self.full_refresh_days = 7
+        
+        # Storage precision for prices, panels and indicator arrays ('float32' halves memory)
+        precision = os.environ.get('NIFTY_PRECISION', 'float64')
+        if precision not in PRICE_DTYPES:
+            print(f"⚠️  NIFTY_PRECISION={precision!r} not supported ({', '.join(PRICE_DTYPES)}) - using float64")
+            precision = 'float64'
+        self.price_dtype = np.dtype(precision)
+        
+        # Correlation / clustering state
+        self.correlation_state = None
+        self.covariance_matrix = None
+        self.correlation_matrix = None
+        self.clusters = {}
+        
+        # Higher timeframes derived from the daily bars: name -> (resample rule, SMA/RSI period)
+        self.timeframes = {'Weekly': ('W-FRI', 20), 'Monthly': ('ME', 6)}
+        self.timeframe_bars = {}
+        self.use_mtf_score = True
+        
+        # Optional extended indicator inputs to the technical score
+        self.use_extended_score = False
+        
+        # Data-quality verdicts per symbol from the validation stage
+        self.data_quality = {}
+        
+        # Scoring inputs per symbol for what-if rescoring
+        self.feature_rows = {}
+        self.features_path = os.path.join(self.cache_dir, 'features.npz')
+        
+        # Computed beta / alpha / relative strength vs the index (optional score input)
+        self.index_relative = pd.DataFrame()
+        self.rolling_beta = pd.DataFrame()
+        self.use_index_relative_score = False
+        
+        # Benchmark index and sector aggregates
+        self.index_symbol = '^NSEI'
+        self.index_data = None
+        self.sector_summary = pd.DataFrame()
+        
+        # Alert rules and triggered alerts
+        self.alert_rules_file = os.environ.get('ALERT_RULES_FILE', 'alert_rules.json')
+        self.alerts = []
+        self.alert_state = {}
+        
+        # Web output: 'compact' (static assets + JSON payload) or 'full' (single page)
+        self.web_mode = os.environ.get('NIFTY_WEB_MODE', 'compact')
+        
+        # Volatility-based sizing: trading capital and fraction risked per trade
+        self.capital = float(os.environ.get('NIFTY_CAPITAL', 1000000))
+        self.risk_per_trade = float(os.environ.get('NIFTY_RISK_PER_TRADE', 0.01))
+        self.atr_stop_multiple = 2.0
+        self.atr_target_multiple = 3.0
+        
+        # Suggested allocation over the buy set
+        self.portfolio = pd.DataFrame()
+        self.portfolio_method = 'risk_parity'
+        self.portfolio_stop_risk = 0.02
+        
+        # Daemon mode: IST run times, NSE holiday calendar, status for the health endpoint
+        self.schedule_times = ['09:37', '16:37']
+        self.holidays_file = os.environ.get('NSE_HOLIDAYS_FILE', 'nse_holidays.txt')
+        self.daemon_status = {}
+        
+        # Personalized watchlist emails
+        self.subscribers_file = os.environ.get('NIFTY_SUBSCRIBERS_FILE', 'subscribers.json')
+        
+        # Provisional report written while a run is still scoring (daemon mode)
+        self.provisional_report_path = None
+        self.provisional_interval_sec = 2.0
+        self._last_provisional = 0.0
     
     def get_ist_time(self):
         """Get current time in IST timezone"""
@@ -85,12 +941,15 @@ class Nifty50CompleteAnalyzer:
     
     def calculate_rsi(self, prices, period=14):
         """Calculate RSI"""
+        return self.calculate_rsi_series(prices, period).iloc[-1]
+    
+    def calculate_rsi_series(self, prices, period=14):
+        """Calculate RSI for every bar"""
         delta = prices.diff()
         gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
         loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
         rs = gain / loss
-        rsi = 100 - (100 / (1 + rs))
-        return rsi.iloc[-1]
+        return 100 - (100 / (1 + rs))
     
     def calculate_macd(self, prices):
         """Calculate MACD"""
@@ -100,6 +959,150 @@ class Nifty50CompleteAnalyzer:
         signal = macd.ewm(span=9, adjust=False).mean()
         return macd.iloc[-1], signal.iloc[-1]
     
+    # ========== EXTENDED INDICATORS ==========
+    
+    def _rolling_sum(self, values, window):
+        """NaN-aware rolling sum along axis 0 via cumulative sums (float64)"""
+        valid = ~np.isnan(values)
+        cum = np.zeros((values.shape[0] + 1,) + values.shape[1:])
+        cum[1:] = np.cumsum(np.where(valid, values, 0.0), axis=0, dtype=np.float64)
+        count = np.zeros_like(cum)
+        count[1:] = np.cumsum(valid, axis=0)
+        
+        out = np.full(values.shape, np.nan)
+        out[window - 1:] = cum[window:] - cum[:-window]
+        full = np.zeros(values.shape, dtype=bool)
+        full[window - 1:] = (count[window:] - count[:-window]) == window
+        return np.where(full, out, np.nan)
+    
+    def calculate_indicator_arrays(self, high, low, close, volume, period=14, bb_period=20,
+                                   bb_std=2.0, stoch_period=14, vwap_period=20):
+        """Bollinger, ATR, ADX, Stochastic, OBV and VWAP in one pass over OHLCV arrays
+        
+        Inputs are (dates,) for one symbol or (dates x symbols) for a whole panel.
+        Arrays are held at the storage precision; running sums and Wilder
+        smoothing state always accumulate in float64.
+        """
+        squeeze = np.ndim(close) == 1
+        work = self.price_dtype
+        high, low, close, volume = (np.atleast_2d(np.asarray(a, dtype=work).T).T
+                                    for a in (high, low, close, volume))
+        n_bars = close.shape[0]
+        
+        # Shared intermediates
+        prev_close = np.vstack([close[:1], close[:-1]])
+        true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+        up_move = np.diff(high, axis=0, prepend=high[:1])
+        down_move = -np.diff(low, axis=0, prepend=low[:1])
+        plus_dm = np.where((up_move > down_move) & (up_move > 0), up_move, 0.0)
+        minus_dm = np.where((down_move > up_move) & (down_move > 0), down_move, 0.0)
+        
+        # Bollinger Bands (shifted by the first close to keep the sum of squares well conditioned)
+        shift = np.where(np.isnan(close[0]), 0.0, close[0]).astype(np.float64)
+        centered = close.astype(np.float64) - shift
+        sum_x = self._rolling_sum(centered, bb_period)
+        sum_x2 = self._rolling_sum(centered ** 2, bb_period)
+        bb_mid = sum_x / bb_period
+        bb_sd = np.sqrt(np.clip((sum_x2 - sum_x ** 2 / bb_period) / (bb_period - 1), 0, None))
+        bb_mid = bb_mid + shift
+        
+        # Wilder smoothing of TR, +DM, -DM and DX in a single loop over bars. Each
+        # column seeds from its own first full window (late listings) and carries
+        # its state across missing bars instead of turning NaN for good.
+        atr = np.full(close.shape, np.nan, dtype=work)
+        plus_di = np.full(close.shape, np.nan, dtype=work)
+        minus_di = np.full(close.shape, np.nan, dtype=work)
+        adx = np.full(close.shape, np.nan, dtype=work)
+        if n_bars > period:
+            valid = np.isfinite(true_range)
+            first = np.where(valid.any(axis=0), valid.argmax(axis=0), n_bars)
+            state = np.zeros((3, close.shape[1]))
+            seen = np.zeros(close.shape[1], dtype=int)
+            adx_t = np.zeros(close.shape[1])
+            dx_seen = np.zeros(close.shape[1], dtype=int)
+            for t in range(1, n_bars):
+                bar = np.vstack([true_range[t], plus_dm[t], minus_dm[t]]).astype(np.float64)
+                ok = valid[t] & (t > first)
+                seeding = ok & (seen < period)
+                state = np.where(seeding, state + bar,
+                                 np.where(ok, state + (bar - state) / period, state))
+                seen = seen + ok
+                state = np.where(seeding & (seen == period), state / period, state)
+                ready = seen >= period
+                if not ready.any():
+                    continue
+                
+                atr_t, pdm_t, mdm_t = state
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    pdi_t = 100 * pdm_t / atr_t
+                    mdi_t = 100 * mdm_t / atr_t
+                    total = pdi_t + mdi_t
+                    dx = np.where(total > 0, 100 * np.abs(pdi_t - mdi_t) / total,
+                                  np.where(np.isfinite(total), 0.0, np.nan))
+                atr[t] = np.where(ready, atr_t, np.nan)
+                plus_di[t] = np.where(ready, pdi_t, np.nan)
+                minus_di[t] = np.where(ready, mdi_t, np.nan)
+                
+                scored = ok & ready & np.isfinite(dx)
+                dx_seeding = scored & (dx_seen < period)
+                adx_t = np.where(dx_seeding, adx_t + dx,
+                                 np.where(scored, adx_t + (dx - adx_t) / period, adx_t))
+                dx_seen = dx_seen + scored
+                adx_t = np.where(dx_seeding & (dx_seen == period), adx_t / period, adx_t)
+                adx[t] = np.where(dx_seen >= period, adx_t, np.nan)
+        
+        # Stochastic oscillator
+        highest = np.full(close.shape, np.nan)
+        lowest = np.full(close.shape, np.nan)
+        if n_bars >= stoch_period:
+            highest[stoch_period - 1:] = np.lib.stride_tricks.sliding_window_view(high, stoch_period, axis=0).max(axis=-1)
+            lowest[stoch_period - 1:] = np.lib.stride_tricks.sliding_window_view(low, stoch_period, axis=0).min(axis=-1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            stoch_k = 100 * (close - lowest) / (highest - lowest)
+        stoch_d = self._rolling_sum(stoch_k, 3) / 3
+        
+        # On-balance volume and rolling VWAP
+        direction = np.sign(np.diff(close, axis=0, prepend=close[:1]))
+        obv = np.cumsum(np.nan_to_num(direction * volume), axis=0, dtype=np.float64)
+        typical = (high + low + close) / 3
+        with np.errstate(divide='ignore', invalid='ignore'):
+            vwap = self._rolling_sum(typical * volume, vwap_period) / self._rolling_sum(volume, vwap_period)
+        
+        indicators = {
+            'BB_Middle': bb_mid,
+            'BB_Upper': bb_mid + bb_std * bb_sd,
+            'BB_Lower': bb_mid - bb_std * bb_sd,
+            'ATR': atr,
+            'Plus_DI': plus_di,
+            'Minus_DI': minus_di,
+            'ADX': adx,
+            'Stoch_K': stoch_k,
+            'Stoch_D': stoch_d,
+            'OBV': obv,
+            'VWAP': vwap,
+        }
+        indicators = {key: value.astype(work, copy=False) for key, value in indicators.items()}
+        if squeeze:
+            indicators = {key: value[:, 0] for key, value in indicators.items()}
+        return indicators
+    
+    def calculate_extended_indicators(self, df):
+        """Latest extended indicator values for one symbol's OHLCV DataFrame"""
+        arrays = self.calculate_indicator_arrays(df['High'], df['Low'], df['Close'], df['Volume'])
+        latest = {key: float(value[-1]) for key, value in arrays.items()}
+        obv = arrays['OBV']
+        latest['OBV_Trend'] = "Rising" if len(obv) >= 20 and obv[-1] > obv[-20:].mean() else "Falling"
+        return latest
+    
+    def calculate_panel_indicators(self):
+        """Extended indicators for every symbol at once over the price panel"""
+        panels = {field: self.build_price_panel(field) for field in ('High', 'Low', 'Close', 'Volume')}
+        if panels['Close'].empty:
+            return {}
+        arrays = self.calculate_indicator_arrays(*(panels[f].to_numpy() for f in ('High', 'Low', 'Close', 'Volume')))
+        index, columns = panels['Close'].index, panels['Close'].columns
+        return {key: pd.DataFrame(value, index=index, columns=columns) for key, value in arrays.items()}
+    
     def get_fundamental_score(self, info):
         """Calculate fundamental score (0-100)"""
         score = 0
@@ -186,16 +1189,467 @@ class Nifty50CompleteAnalyzer:
         
         return min(score, 100)
     
-    def analyze_stock(self, symbol, name):
-        """Analyze individual stock - Technical + Fundamental"""
+    def _default_run_id(self):
+        """RUN_ID from the environment, else date + session (AM/PM)"""
+        now = self.get_ist_time()
+        return os.environ.get('RUN_ID') or f"{now.strftime('%Y%m%d')}-{'AM' if now.hour < 12 else 'PM'}"
+    
+    def reset_run_state(self):
+        """Clear per-run outputs while keeping warm price and fundamentals caches"""
+        self.results = []
+        self.ranker = StreamingTopK(k=10)
+        self.feature_rows = {}
+        self.alerts = []
+        self.run_id = self._default_run_id()
+        self.index_data = None
+        self.covariance_matrix = None
+        self.correlation_matrix = None
+        self.clusters = {}
+        self.sector_summary = pd.DataFrame()
+        self.portfolio = pd.DataFrame()
+        self.index_relative = pd.DataFrame()
+        self.rolling_beta = pd.DataFrame()
+    
+    def _to_storage(self, df):
+        """Cast a price DataFrame's numeric columns to the storage precision"""
+        columns = [col for col in ('Open', 'High', 'Low', 'Close', 'Volume') if col in df and df[col].dtype != self.price_dtype]
+        return df.astype({col: self.price_dtype for col in columns}) if columns else df
+    
+    def _full_history(self, stock):
+        """Fetch a full year of bars and stamp when it was fetched"""
+        df = stock.history(period='1y')
+        df.attrs['full_fetch'] = pd.Timestamp.now().isoformat()
+        return df
+    
+    def _history_adjusted(self, cached, recent):
+        """True if yfinance may have back-adjusted the history since it was cached"""
+        for column in ('Stock Splits', 'Dividends'):
+            if column in recent and (recent[column].fillna(0) != 0).any():
+                return True
+        
+        # Overlapping bars must still match; the last cached bar may have been intraday
+        overlap = recent.index.intersection(cached.index[:-1])
+        if overlap.empty:
+            return False
+        old = cached.loc[overlap, 'Close'].to_numpy(dtype=np.float64)
+        new = recent.loc[overlap, 'Close'].to_numpy(dtype=np.float64)
+        return not np.allclose(old, new, rtol=1e-3, equal_nan=True)
+    
+    def _fetch_history(self, stock, symbol):
+        """One year of daily bars; with a warm cache only the last few days are fetched
+        
+        Splits and dividends make yfinance back-adjust the whole history, so a
+        corporate action, a mismatch on the overlapping bars or a stale full
+        fetch (older than full_refresh_days) triggers a full refetch instead.
+        """
+        cached = self.price_data.get(symbol)
+        if cached is None or cached.empty:
+            return self._full_history(stock)
+        
+        fetched = cached.attrs.get('full_fetch')
+        if fetched is None or (pd.Timestamp.now() - pd.Timestamp(fetched)).days >= self.full_refresh_days:
+            return self._full_history(stock)
+        
+        # A cache restored from an earlier day may be more than a few bars behind;
+        # start a few bars back so there is an overlap to compare
+        last_bar = cached.index[-1]
+        if (pd.Timestamp.now(tz=last_bar.tz) - last_bar).days > 5:
+            recent = stock.history(start=cached.index[-min(len(cached), 5)].strftime('%Y-%m-%d'))
+        else:
+            recent = stock.history(period='5d')
+        if recent.empty:
+            return cached
+        
+        if self._history_adjusted(cached, recent):
+            print(f"  🔁 {symbol}: history was adjusted (split/dividend) - refetching full year")
+            return self._full_history(stock)
+        
+        combined = pd.concat([cached[cached.index < recent.index[0]], recent])
+        combined = combined[combined.index > combined.index[-1] - timedelta(days=365)]
+        combined.attrs['full_fetch'] = fetched
+        return combined
+    
+    def _atomic_write(self, path, data):
+        """Write to a temp file in the same directory, then rename over the target"""
+        directory = os.path.dirname(path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data.encode('utf-8') if isinstance(data, str) else data)
+                f.flush()
+                os.fsync(f.fileno())
+            # mkstemp creates 0600; published pages must stay readable like a plain open() would leave them
+            os.chmod(tmp_path, 0o666 & ~_UMASK)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    
+    # ========== CHECKPOINT / RESUME ==========
+    
+    def _run_dir(self):
+        """Journal directory for the current run id"""
+        return os.path.join(self.cache_dir, 'runs', self.run_id)
+    
+    def load_run_journal(self):
+        """Symbols already completed under this run id (none once the run finished)"""
+        completed = {}
+        if os.path.exists(os.path.join(self._run_dir(), 'complete')):
+            # A finished run with the same id: start over rather than reuse its data
+            shutil.rmtree(self._run_dir(), ignore_errors=True)
+            return completed
+        
+        path = os.path.join(self._run_dir(), 'journal.jsonl')
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line from a crash
+                    completed[entry['symbol']] = entry
+        except OSError:
+            pass
+        return completed
+    
+    def checkpoint_symbol(self, symbol):
+        """Persist a fetched symbol's price data and fundamentals to the run journal"""
+        run_dir = self._run_dir()
+        prices_dir = os.path.join(run_dir, 'prices')
+        os.makedirs(prices_dir, exist_ok=True)
+        
+        # Price data first, so a journal entry always has its data on disk
+        buffer_path = os.path.join(prices_dir, f".tmp-{symbol}.pkl")
+        self.price_data[symbol].to_pickle(buffer_path)
+        os.replace(buffer_path, os.path.join(prices_dir, f"{symbol}.pkl"))
+        
+        entry = {'symbol': symbol, 'info': self.fundamentals.get(symbol, {})}
+        with open(os.path.join(run_dir, 'journal.jsonl'), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, default=str) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+    
+    def complete_run_journal(self):
+        """Mark this run's journal finished so a later run with the same id refetches"""
+        run_dir = self._run_dir()
+        if os.path.isdir(run_dir):
+            self._atomic_write(os.path.join(run_dir, 'complete'), self.get_ist_time().isoformat())
+    
+    def restore_symbol(self, symbol, entry):
+        """Restore a journaled symbol's data; False if its data is missing"""
+        path = os.path.join(self._run_dir(), 'prices', f"{symbol}.pkl")
+        try:
+            df = pd.read_pickle(path)
+        except Exception:
+            return False
+        
+        self.price_data[symbol] = self._to_storage(df)
+        self.fundamentals[symbol] = entry.get('info', {})
+        return True
+    
+    def prune_run_journals(self, keep=4):
+        """Remove all but the most recent run journals"""
+        runs_dir = os.path.join(self.cache_dir, 'runs')
+        if not os.path.isdir(runs_dir):
+            return
+        runs = sorted(os.listdir(runs_dir))
+        for run_id in runs[:-keep]:
+            if run_id != self.run_id:
+                shutil.rmtree(os.path.join(runs_dir, run_id), ignore_errors=True)
+    
+    # ========== CACHE BUNDLE ==========
+    
+    def _cache_bundle_members(self):
+        """Serialized cache state as {member name: (part, bytes)}"""
+        members = {}
+        for symbol, df in self.price_data.items():
+            members[f"prices/{symbol}.pkl"] = ('prices', pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL))
+        if self.timeframe_bars:
+            members['indicators/timeframe_bars.pkl'] = (
+                'indicators', pickle.dumps(self.timeframe_bars, protocol=pickle.HIGHEST_PROTOCOL))
+        
+        # Files the next run reads: fundamentals, previous results and alert state
+        for filename, part in (('fundamentals_cache.json', 'fundamentals'),
+                               ('previous_results.json', 'history'),
+                               ('alert_state.json', 'history'),
+                               ('features.npz', 'history')):
+            path = os.path.join(self.cache_dir, filename)
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    members[f"files/{filename}"] = (part, f.read())
+        
+        # Rendered stock pages and their manifest, which the deploy publishes as a whole
+        if os.path.isdir(self.stock_pages_dir):
+            for filename in sorted(os.listdir(self.stock_pages_dir)):
+                if filename == 'manifest.json' or filename.endswith('.html'):
+                    with open(os.path.join(self.stock_pages_dir, filename), 'rb') as f:
+                        members[f"pages/{filename}"] = ('pages', f.read())
+        return members
+    
+    def _read_bundle_manifest(self, path):
+        """Manifest of an existing bundle, or None"""
+        try:
+            with tarfile.open(path, 'r:gz') as tar:
+                return json.load(tar.extractfile('manifest.json'))
+        except Exception:
+            return None
+    
+    def save_cache_bundle(self, path=None):
+        """Pack prices, fundamentals, indicator state and alert history into one tar.gz
+        
+        The manifest records the bundle version, the pandas version the pickles
+        were written with and a sha256 per member; the bundle is only rewritten
+        when its content hash changes.
+        """
+        path = path or self.cache_bundle_path
+        if not path:
+            return None
+        
+        members = self._cache_bundle_members()
+        entries = {name: {'part': part, 'sha256': hashlib.sha256(data).hexdigest(), 'size': len(data)}
+                   for name, (part, data) in sorted(members.items())}
+        content_hash = hashlib.sha256(json.dumps(entries, sort_keys=True).encode('utf-8')).hexdigest()
+        
+        previous = self._read_bundle_manifest(path)
+        if previous and previous.get('content_hash') == content_hash:
+            print(f"📦 Cache bundle unchanged ({content_hash[:10]})\n")
+            return path
+        
+        manifest = {
+            'version': CACHE_BUNDLE_VERSION,
+            'created_at': self.get_ist_time().isoformat(),
+            'pandas': pd.__version__,
+            'content_hash': content_hash,
+            'members': entries,
+        }
+        
+        # Manifest first, so a restore can validate before reading any data
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode='w') as tar:
+            files = [('manifest.json', json.dumps(manifest, indent=1).encode('utf-8'))]
+            files += [(name, members[name][1]) for name in entries]
+            for name, data in files:
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+        archive = gzip.compress(buffer.getvalue(), compresslevel=6, mtime=0)
+        self._atomic_write(path, archive)
+        
+        print(f"📦 Cache bundle: {len(entries)} members, {len(archive) / 1024:.0f} KB ({content_hash[:10]})\n")
+        return path
+    
+    def restore_cache_bundle(self, path=None, parts=('prices', 'indicators', 'fundamentals', 'history', 'pages')):
+        """Restore cache state from a bundle; members that fail validation are skipped
+        
+        Pickled parts are only used when written by the same pandas version. Local
+        state wins: symbols already in memory and cache files already on disk are
+        kept. Returns the set of parts that were restored.
+        """
+        path = path or self.cache_bundle_path
+        if not path or not os.path.exists(path):
+            return set()
+        
+        restored, skipped = set(), 0
+        try:
+            with tarfile.open(path, 'r:gz') as tar:
+                manifest = json.load(tar.extractfile('manifest.json'))
+                if manifest.get('version') != CACHE_BUNDLE_VERSION:
+                    print(f"⚠️  Cache bundle version {manifest.get('version')} != {CACHE_BUNDLE_VERSION} - starting cold")
+                    return restored
+                
+                pickles_ok = manifest.get('pandas') == pd.__version__
+                for name, meta in manifest.get('members', {}).items():
+                    part = meta.get('part')
+                    if part not in parts:
+                        continue
+                    if part in ('prices', 'indicators') and not pickles_ok:
+                        skipped += 1
+                        continue
+                    try:
+                        data = tar.extractfile(name).read()
+                        if hashlib.sha256(data).hexdigest() != meta.get('sha256'):
+                            raise ValueError('checksum mismatch')
+                        self._restore_bundle_member(name, part, data)
+                        restored.add(part)
+                    except Exception:
+                        skipped += 1
+        except Exception as e:
+            print(f"⚠️  Cache bundle unreadable ({e}) - continuing with what was restored")
+        
+        # Bundle members are stored sorted; keep panels, clusters and pages in universe order
+        rank = {symbol: idx for idx, symbol in enumerate(self.nifty50_stocks)}
+        self.price_data = dict(sorted(self.price_data.items(), key=lambda item: rank.get(item[0], len(rank))))
+        
+        print(f"📦 Cache bundle restored: {', '.join(sorted(restored)) or 'nothing'}"
+              f"{f' ({skipped} members skipped)' if skipped else ''}\n")
+        return restored
+    
+    def _restore_bundle_member(self, name, part, data):
+        """Apply one validated bundle member"""
+        if part == 'prices':
+            symbol = name[len('prices/'):-len('.pkl')]
+            df = pickle.loads(data)
+            # A float32 bundle can't seed a float64 run; those symbols are refetched
+            if symbol not in self.price_data and df['Close'].dtype.itemsize >= self.price_dtype.itemsize:
+                self.price_data[symbol] = self._to_storage(df)
+        elif part == 'indicators':
+            self.timeframe_bars = {**pickle.loads(data), **self.timeframe_bars}
+        else:
+            directory = self.stock_pages_dir if part == 'pages' else self.cache_dir
+            target = os.path.join(directory, os.path.basename(name))
+            if not os.path.exists(target):
+                self._atomic_write(target, data)
+                if part == 'fundamentals':
+                    self.fundamentals_cache = None
+    
+    def load_fundamentals_cache(self):
+        """Load cached fundamentals and sector metadata from disk"""
+        path = os.path.join(self.cache_dir, 'fundamentals_cache.json')
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.fundamentals_cache = json.load(f)
+        except (OSError, ValueError):
+            self.fundamentals_cache = {}
+        return self.fundamentals_cache
+    
+    def save_fundamentals_cache(self):
+        """Persist fundamentals and sector metadata to disk"""
+        if self.fundamentals_cache is None:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = os.path.join(self.cache_dir, 'fundamentals_cache.json')
+        self._atomic_write(path, json.dumps(self.fundamentals_cache, default=str))
+    
+    def get_fundamentals(self, stock, symbol, max_age_hours=24):
+        """Return .info for a ticker, served from the local cache while fresh"""
+        if self.fundamentals_cache is None:
+            self.load_fundamentals_cache()
+        
+        now = self.get_ist_time()
+        entry = self.fundamentals_cache.get(symbol)
+        if entry:
+            age = now - datetime.fromisoformat(entry['fetched_at'])
+            if age.total_seconds() < max_age_hours * 3600:
+                return entry['info']
+        
+        info = stock.info
+        self.fundamentals_cache[symbol] = {
+            'fetched_at': now.isoformat(),
+            'sector': info.get('sector') or 'Unknown',
+            'industry': info.get('industry') or 'Unknown',
+            'info': info,
+        }
+        return info
+    
+    def update_timeframe_bars(self, symbol, df):
+        """Maintain weekly/monthly bars incrementally from the daily data"""
+        aggregation = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+        cached = self.timeframe_bars.get(symbol, {})
+        fetched = df.attrs.get('full_fetch')
+        bars = {}
+        
+        for tf, (rule, period) in self.timeframes.items():
+            prev = cached.get(tf)
+            if self._timeframe_bars_current(prev, df, rule, aggregation, fetched):
+                # Only re-aggregate the (possibly incomplete) last period and anything newer
+                tail = df[df.index > prev.index[-2]]
+                fresh = tail.resample(rule).agg(aggregation).dropna(subset=['Close'])
+                combined = pd.concat([prev.iloc[:-1], fresh])
+            else:
+                combined = df.resample(rule).agg(aggregation).dropna(subset=['Close'])
+            
+            # Same span as the daily data (period labels are period ends)
+            combined = combined[combined.index >= df.index[0]]
+            combined.attrs['full_fetch'] = fetched
+            bars[tf] = combined
+        
+        self.timeframe_bars[symbol] = bars
+        return bars
+    
+    def _timeframe_bars_current(self, prev, df, rule, aggregation, fetched):
+        """True if cached bars still match the daily data and only their tail needs updating
+        
+        A refetched (back-adjusted) history or a last complete period that no
+        longer re-aggregates to the cached bar means the bars must be rebuilt.
+        """
+        if prev is None or len(prev) < 3 or prev.attrs.get('full_fetch') != fetched:
+            return False
+        if df.index[0] > prev.index[-3]:
+            return False
+        
+        window = df[(df.index > prev.index[-3]) & (df.index <= prev.index[-2])]
+        check = window.resample(rule).agg(aggregation).dropna(subset=['Close'])
+        if len(check) != 1 or check.index[0] != prev.index[-2]:
+            return False
+        columns = list(aggregation)
+        return np.allclose(check[columns].to_numpy(dtype=np.float64)[0], prev[columns].to_numpy(dtype=np.float64)[-2],
+                           rtol=1e-6, equal_nan=True)
+    
+    def analyze_timeframes(self, symbol, df):
+        """SMA / RSI / MACD trend on weekly and monthly bars"""
+        bars = self.update_timeframe_bars(symbol, df)
+        signals = {}
+        
+        for tf, (rule, period) in self.timeframes.items():
+            close = bars[tf]['Close']
+            if len(close) < period + 1:
+                signals[tf] = {'RSI': None, 'Trend': 0}
+                continue
+            
+            sma = close.rolling(window=period).mean().iloc[-1]
+            rsi = self.calculate_rsi_series(close, period).iloc[-1]
+            above_sma = close.iloc[-1] > sma
+            
+            # MACD needs ~35 bars; fall back to the SMA alone when history is short
+            if len(close) >= 35:
+                macd, signal = self.calculate_macd(close)
+                trend = 1 if above_sma and macd > signal else -1 if not above_sma and macd < signal else 0
+            else:
+                trend = 1 if above_sma else -1
+            
+            signals[tf] = {'RSI': rsi, 'Trend': trend}
+        
+        return signals
+    
+    def fetch_stock_data(self, symbol):
+        """Fetch price history and fundamentals for one symbol"""
         try:
             stock = yf.Ticker(symbol)
-            df = stock.history(period='1y')
-            info = stock.info
+            df = self._fetch_history(stock, symbol)
+            info = self.get_fundamentals(stock, symbol)
+        except Exception:
+            return None
+        
+        if df.empty:
+            return None
+        
+        df = self._to_storage(df)
+        self.price_data[symbol] = df
+        self.fundamentals[symbol] = info
+        return df, info
+    
+    def analyze_stock(self, symbol, name, df=None, info=None):
+        """Analyze individual stock - Technical + Fundamental"""
+        try:
+            if df is None or info is None:
+                fetched = self.fetch_stock_data(symbol)
+                if fetched is None:
+                    return None
+                df, info = fetched
             
             if df.empty or len(df) < 200:
                 return None
             
+            # Reduced-precision storage: score from a transient float64 copy of this symbol
+            if self.price_dtype != np.float64:
+                df = df.astype({col: np.float64 for col in ('Open', 'High', 'Low', 'Close', 'Volume') if col in df})
+            
+            # Drop fundamentals the validation stage marked as suspect
+            dq = self.data_quality.get(symbol, {'flags': [], 'quarantined': False, 'drop_fields': []})
+            info = {key: value for key, value in info.items() if key not in dq['drop_fields']}
+            
             # ========== TECHNICAL ANALYSIS ==========
             current_price = df['Close'].iloc[-1]
             
@@ -217,8 +1671,15 @@ class Nifty50CompleteAnalyzer:
             high_52w = df['High'].tail(252).max()
             low_52w = df['Low'].tail(252).min()
             
+            # Weekly / Monthly signals from the same daily data
+            timeframe_signals = self.analyze_timeframes(symbol, df)
+            
+            # Bollinger / ATR / ADX / Stochastic / OBV / VWAP
+            ext = self.calculate_extended_indicators(df)
+            
             # Technical Score (-6 to +6)
             tech_score = 0
+            tech_score_range = 6
             
             if current_price > sma_20:
                 tech_score += 1
@@ -250,6 +1711,49 @@ class Nifty50CompleteAnalyzer:
             else:
                 tech_score -= 1
                 macd_signal = "Bearish"
+            core_points = tech_score
+            
+            # Multi-timeframe agreement (+1 / -1 when daily, weekly and monthly trends align)
+            daily_trend = 1 if current_price > sma_50 and macd > signal else -1 if current_price < sma_50 and macd < signal else 0
+            trends = [daily_trend] + [tf['Trend'] for tf in timeframe_signals.values()]
+            mtf_agreement = 1 if all(t == 1 for t in trends) else -1 if all(t == -1 for t in trends) else 0
+            if self.use_mtf_score:
+                tech_score += mtf_agreement
+                tech_score_range += 1
+            
+            # Optional extended indicator components (+/-1 each)
+            ext_points = 0
+            if ext['ADX'] > 25:
+                ext_points += 1 if ext['Plus_DI'] > ext['Minus_DI'] else -1
+            if current_price < ext['BB_Lower']:
+                ext_points += 1
+            elif current_price > ext['BB_Upper']:
+                ext_points -= 1
+            if ext['Stoch_K'] < 20:
+                ext_points += 1
+            elif ext['Stoch_K'] > 80:
+                ext_points -= 1
+            if self.use_extended_score:
+                tech_score += ext_points
+                tech_score_range += 3
+            
+            # Computed beta / alpha / relative strength vs the index
+            relative = {}
+            key = symbol.replace('.NS', '')
+            if key in self.index_relative.index:
+                relative = self.index_relative.loc[key].dropna().to_dict()
+            
+            # Optional index-relative component (+1 / -1 when alpha and relative strength agree)
+            has_relative = {'Alpha', 'RS_Index'} <= set(relative)
+            relative_points = 0
+            if has_relative:
+                if relative['Alpha'] > 0 and relative['RS_Index'] > 1:
+                    relative_points = 1
+                elif relative['Alpha'] < 0 and relative['RS_Index'] < 1:
+                    relative_points = -1
+            if self.use_index_relative_score and has_relative:
+                tech_score += relative_points
+                tech_score_range += 1
             
             # ========== FUNDAMENTAL ANALYSIS ==========
             
@@ -277,7 +1781,7 @@ class Nifty50CompleteAnalyzer:
             quick_ratio = info.get('quickRatio', 0)
             
             # Other
-            beta = info.get('beta', 1.0)
+            beta = info.get('beta') or relative.get('Beta_Calc', 1.0)
             analyst_recommendation = info.get('recommendationKey', 'hold')
             target_price = info.get('targetMeanPrice', current_price)
             
@@ -287,7 +1791,7 @@ class Nifty50CompleteAnalyzer:
             # ========== COMBINED SCORING ==========
             
             # Normalize technical score to 0-100 scale
-            tech_score_normalized = ((tech_score + 6) / 12) * 100
+            tech_score_normalized = ((tech_score + tech_score_range) / (2 * tech_score_range)) * 100
             
             # Combined score (50% technical + 50% fundamental)
             combined_score = (tech_score_normalized * 0.5) + (fund_score * 0.5)
@@ -309,6 +1813,11 @@ class Nifty50CompleteAnalyzer:
                 rating = "⭐ STRONG SELL"
                 recommendation = "STRONG SELL"
             
+            # Quarantined data never produces a trade signal
+            if dq['quarantined']:
+                rating = "⚠️ DATA QUARANTINED"
+                recommendation = "HOLD"
+            
             # Stop Loss & Targets
             if recommendation in ["STRONG BUY", "BUY"]:
                 stop_loss = support * 0.97
@@ -338,10 +1847,18 @@ class Nifty50CompleteAnalyzer:
             else:
                 quality = "Poor"
             
+            # Raw scoring inputs, so the run can be rescored under other weights
+            self.feature_rows[symbol.replace('.NS', '')] = [
+                current_price, support, resistance, target_price, fund_score, core_points,
+                mtf_agreement, ext_points, relative_points, float(has_relative), float(dq['quarantined']),
+            ]
+            
             result = {
                 # Basic Info
                 'Symbol': symbol.replace('.NS', ''),
                 'Name': name,
+                'Sector': info.get('sector') or 'Unknown',
+                'Industry': info.get('industry') or 'Unknown',
                 'Price': round(current_price, 2),
                 
                 # Technical
@@ -356,7 +1873,19 @@ class Nifty50CompleteAnalyzer:
                 '52W_High': round(high_52w, 2),
                 '52W_Low': round(low_52w, 2),
                 'Tech_Score': tech_score,
-                'Tech_Score_Norm': round(tech_score_normalized, 1),
+                'Tech_Score_Norm': float(np.round(tech_score_normalized, 1)),
+                'Weekly_RSI': round(timeframe_signals['Weekly']['RSI'], 2) if timeframe_signals['Weekly']['RSI'] is not None else 0,
+                'Weekly_Trend': timeframe_signals['Weekly']['Trend'],
+                'Monthly_RSI': round(timeframe_signals['Monthly']['RSI'], 2) if timeframe_signals['Monthly']['RSI'] is not None else 0,
+                'Monthly_Trend': timeframe_signals['Monthly']['Trend'],
+                'MTF_Agreement': mtf_agreement,
+                'BB_Upper': round(ext['BB_Upper'], 2),
+                'BB_Lower': round(ext['BB_Lower'], 2),
+                'ATR': round(ext['ATR'], 2),
+                'ADX': round(ext['ADX'], 2),
+                'Stoch_K': round(ext['Stoch_K'], 2),
+                'VWAP': round(ext['VWAP'], 2),
+                'OBV_Trend': ext['OBV_Trend'],
                 
                 # Fundamental
                 'PE_Ratio': round(pe_ratio, 2) if pe_ratio else 0,
@@ -374,22 +1903,29 @@ class Nifty50CompleteAnalyzer:
                 'Current_Ratio': round(current_ratio, 2) if current_ratio else 0,
                 'Market_Cap': round(market_cap / 1e12, 2) if market_cap else 0,
                 'Beta': round(beta, 2) if beta else 1.0,
+                'Beta_Calc': round(relative['Beta_Calc'], 2) if 'Beta_Calc' in relative else None,
+                'Alpha': round(relative['Alpha'], 2) if 'Alpha' in relative else None,
+                'RS_Index': round(relative['RS_Index'], 2) if 'RS_Index' in relative else None,
                 'Fund_Score': round(fund_score, 1),
                 'Quality': quality,
                 
                 # Combined
-                'Combined_Score': round(combined_score, 1),
+                'Combined_Score': float(np.round(combined_score, 1)),
                 'Rating': rating,
                 'Recommendation': recommendation,
                 
                 # Trading
-                'Stop_Loss': round(stop_loss, 2),
-                'SL_Percentage': round(sl_percentage, 2),
-                'Target_1': round(target_1, 2),
-                'Target_2': round(target_2, 2),
+                'Stop_Loss': float(np.round(stop_loss, 2)),
+                'SL_Percentage': float(np.round(sl_percentage, 2)),
+                'Target_1': float(np.round(target_1, 2)),
+                'Target_2': float(np.round(target_2, 2)),
                 'Target_Price': round(target_price, 2) if target_price else 0,
-                'Upside': round(upside, 2),
-                'Risk_Reward': round(risk_reward, 2),
+                'Upside': float(np.round(upside, 2)),
+                'Risk_Reward': float(np.round(risk_reward, 2)),
+                
+                # Data quality
+                'DQ_Status': "QUARANTINED" if dq['quarantined'] else "FLAGGED" if dq['flags'] else "OK",
+                'DQ_Flags': ",".join(dq['flags']),
             }
             
             return result
@@ -401,281 +1937,1198 @@ class Nifty50CompleteAnalyzer:
         """Analyze all Nifty 50 stocks"""
         print(f"🔍 Analyzing {len(self.nifty50_stocks)} NIFTY 50 stocks...")
         
+        # Resume from the run journal if this run id was interrupted
+        self.prune_run_journals()
+        completed = self.load_run_journal()
+        if completed:
+            print(f"♻️  Resuming run {self.run_id}: {len(completed)} stocks already done")
+        
+        # Phase 1: fetch (checkpointed per symbol). With a provisional page each
+        # symbol is also scored on arrival, before the panel-wide checks.
+        fetched = []
+        self.data_quality = {}
         for idx, (symbol, name) in enumerate(self.nifty50_stocks.items(), 1):
-            result = self.analyze_stock(symbol, name)
+            if symbol in completed and self.restore_symbol(symbol, completed[symbol]):
+                fetched.append(symbol)
+                print(f"  [{idx}/{len(self.nifty50_stocks)}] {name} (resumed)")
+            else:
+                if self.fetch_stock_data(symbol) is not None:
+                    fetched.append(symbol)
+                    self.checkpoint_symbol(symbol)
+                print(f"  [{idx}/{len(self.nifty50_stocks)}] {name}")
+            
+            if self.provisional_report_path and fetched and fetched[-1] == symbol:
+                result = self.analyze_stock(symbol, name, self.price_data[symbol], self.fundamentals[symbol])
+                if result:
+                    self.ranker.push(result)
+            self.report_progress('fetching', idx, len(self.nifty50_stocks))
+        
+        self.save_fundamentals_cache()
+        
+        # Phase 2: validate the whole panel and fundamentals table at once
+        self.validate_data(fetched)
+        self.calculate_index_relative(fetched)
+        
+        # Phase 3: final scores replace the provisional ranking as they arrive
+        self.ranker = StreamingTopK(k=self.ranker.k)
+        for idx, symbol in enumerate(fetched, 1):
+            result = self.analyze_stock(symbol, self.nifty50_stocks[symbol],
+                                        self.price_data[symbol], self.fundamentals[symbol])
             if result:
                 self.results.append(result)
-            print(f"  [{idx}/{len(self.nifty50_stocks)}] {name}")
+                self.ranker.push(result)
+            self.report_progress('scoring', idx, len(fetched))
         
         print(f"✅ Analysis complete: {len(self.results)} stocks analyzed\n")
     
-    def get_top_recommendations(self):
-        """Get top 10 buy and sell recommendations"""
+    def report_progress(self, phase, done, total):
+        """Publish run progress and a throttled provisional report"""
+        if self.daemon_status:
+            self.daemon_status['progress'] = {'phase': phase, 'done': done, 'total': total}
+        if not self.provisional_report_path:
+            return
+        
+        now = time.monotonic()
+        if done < total and now - self._last_provisional < self.provisional_interval_sec:
+            return
+        self._last_provisional = now
+        self._atomic_write(self.provisional_report_path, self.generate_provisional_html(done, total, phase))
+    
+    # ========== DATA QUALITY ==========
+    
+    def validate_data(self, symbols, stale_days=4, jump_threshold=0.40, jump_lookback=60):
+        """Vectorized checks over the price panel and fundamentals table before scoring
+        
+        Hard price problems quarantine a symbol (it scores, but never becomes a
+        BUY/SELL); suspect fundamentals are dropped from scoring and flagged.
+        """
+        self.data_quality = {}
+        if not symbols:
+            return self.data_quality
+        
+        close = self.build_price_panel('Close', symbols, fill=False)
+        volume = self.build_price_panel('Volume', symbols, fill=False)
+        values = close.to_numpy(dtype=float)
+        valid = ~np.isnan(values)
+        n_bars = len(close)
+        
+        # Price panel checks
+        last_valid = np.where(valid.any(axis=0), n_bars - 1 - np.argmax(valid[::-1], axis=0), -1)
+        last_date = close.index[np.maximum(last_valid, 0)]
+        stale = (last_date.max() - last_date) > pd.Timedelta(days=stale_days)
+        nan_last = np.isnan(values[-1])
+        filled = close.ffill().to_numpy(dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_returns = np.abs(np.diff(np.log(filled[-jump_lookback - 1:]), axis=0))
+        price_jump = np.nanmax(np.where(np.isnan(log_returns), 0, log_returns), axis=0) > np.log1p(jump_threshold)
+        non_positive = (np.nan_to_num(values, nan=1.0) <= 0).any(axis=0)
+        zero_volume = (volume.tail(20).to_numpy(dtype=float) == 0).sum(axis=0) > 2
+        short_history = valid.sum(axis=0) < 200
+        
+        price_checks = {
+            'STALE_LAST_BAR': (np.asarray(stale), True),
+            'NAN_CLOSE': (nan_last, True),
+            'PRICE_JUMP': (price_jump, True),
+            'NON_POSITIVE_PRICE': (non_positive, True),
+            'ZERO_VOLUME': (zero_volume, False),
+            'SHORT_HISTORY': (short_history, False),
+        }
+        
+        # Fundamentals table checks: (flag, info field to drop, predicate)
+        fundamentals = pd.DataFrame([self.fundamentals.get(symbol, {}) for symbol in symbols])
+        fields = ['trailingPE', 'priceToBook', 'marketCap', 'returnOnEquity', 'profitMargins',
+                  'debtToEquity', 'targetMeanPrice']
+        table = fundamentals.reindex(columns=fields).apply(pd.to_numeric, errors='coerce')
+        last_price = close.ffill().iloc[-1].to_numpy(dtype=float)
+        fundamental_checks = [
+            ('NEG_PE', 'trailingPE', table['trailingPE'] < 0),
+            ('NEG_PB', 'priceToBook', table['priceToBook'] < 0),
+            ('BAD_MARKET_CAP', 'marketCap', table['marketCap'].fillna(0) <= 0),
+            ('ABSURD_ROE', 'returnOnEquity', table['returnOnEquity'].abs() > 5),
+            ('ABSURD_MARGIN', 'profitMargins', table['profitMargins'].abs() > 1),
+            ('NEG_DEBT_EQUITY', 'debtToEquity', table['debtToEquity'] < 0),
+            ('BAD_TARGET', 'targetMeanPrice', (table['targetMeanPrice'] <= 0)
+                | (table['targetMeanPrice'] > 5 * last_price)),
+        ]
+        
+        flagged = 0
+        for i, symbol in enumerate(symbols):
+            flags = [flag for flag, (mask, _) in price_checks.items() if mask[i]]
+            quarantined = any(price_checks[flag][1] for flag in flags)
+            drop_fields = []
+            for flag, field, mask in fundamental_checks:
+                if mask.iloc[i]:
+                    flags.append(flag)
+                    drop_fields.append(field)
+            
+            self.data_quality[symbol] = {'flags': flags, 'quarantined': quarantined, 'drop_fields': drop_fields}
+            flagged += bool(flags)
+        
+        quarantined_count = sum(dq['quarantined'] for dq in self.data_quality.values())
+        print(f"🧪 Data quality: {flagged} flagged, {quarantined_count} quarantined of {len(symbols)}")
+        return self.data_quality
+    
+    def get_data_quality_issues(self):
+        """Results that were flagged or quarantined, quarantined first"""
+        issues = [r for r in self.results if r.get('DQ_Status', 'OK') != 'OK']
+        return sorted(issues, key=lambda r: r['DQ_Status'] != 'QUARANTINED')
+    
+    # ========== UNIVERSE-WIDE ANALYSIS ==========
+    
+    def build_price_panel(self, field='Close', symbols=None, fill=True):
+        """Align stored price history into a dates x symbols panel"""
+        symbols = list(self.price_data) if symbols is None else symbols
+        if not symbols:
+            return pd.DataFrame()
+        
+        panel = pd.concat(
+            {symbol.replace('.NS', ''): self.price_data[symbol][field] for symbol in symbols},
+            axis=1
+        ).sort_index()
+        return panel.ffill() if fill else panel
+    
+    def calculate_correlation_matrix(self, window=60):
+        """Rolling return covariance/correlation for the whole universe
+        
+        The running sums persist between runs of a resident (daemon) process, so
+        later runs only roll in the bars that arrived since the last one.
+        """
+        panel = self.build_price_panel('Close')
+        if panel.shape[1] < 2:
+            return None
+        
+        log_prices = np.log(panel.astype(np.float64))
+        if self._roll_correlation_state(log_prices, window):
+            return self._correlation_from_state()
+        
+        returns = log_prices.diff().iloc[1:].tail(window).fillna(0.0)
+        X = returns.to_numpy(dtype=np.float64)
+        
+        # Running sums let new bars be folded in without recomputing the window
+        self.correlation_state = {
+            'symbols': list(returns.columns),
+            'window': X.copy(),
+            'pos': 0,
+            'sum': X.sum(axis=0),
+            'cross': X.T @ X,
+            'last_date': log_prices.index[-1],
+            'last_prices': log_prices.iloc[-1].to_numpy(),
+            'updates': 0,
+        }
+        return self._correlation_from_state()
+    
+    def _roll_correlation_state(self, log_prices, window, max_updates=250):
+        """Fold bars newer than the kept state into it; False when a full recompute is needed
+        
+        Recomputes if the universe or window changed, if the last bar already
+        seen no longer matches (intraday bar finalized, split refetch), or after
+        max_updates rolled bars to shed accumulated rounding.
+        """
+        state = self.correlation_state
+        if (state is None or len(state['window']) != window or state['symbols'] != list(log_prices.columns)
+                or state['last_date'] not in log_prices.index):
+            return False
+        if not np.allclose(log_prices.loc[state['last_date']].to_numpy(), state['last_prices'],
+                           rtol=1e-9, atol=0.0, equal_nan=True):
+            return False
+        
+        new_returns = log_prices.diff().loc[log_prices.index > state['last_date']].fillna(0.0)
+        if len(new_returns) >= window or state['updates'] + len(new_returns) > max_updates:
+            return False
+        
+        for _, bar in new_returns.iterrows():
+            self.update_correlation_matrix(bar)
+        state['last_date'] = log_prices.index[-1]
+        state['last_prices'] = log_prices.iloc[-1].to_numpy()
+        state['updates'] += len(new_returns)
+        return True
+    
+    def update_correlation_matrix(self, new_returns):
+        """Roll one new bar of returns (Series by symbol) into the correlation window"""
+        state = self.correlation_state
+        if state is None:
+            return None
+        
+        x = pd.Series(new_returns).reindex(state['symbols']).fillna(0.0).to_numpy(dtype=np.float64)
+        old = state['window'][state['pos']].copy()
+        
+        # Rank-1 updates: add the new bar, drop the oldest one
+        state['sum'] += x - old
+        state['cross'] += np.outer(x, x) - np.outer(old, old)
+        state['window'][state['pos']] = x
+        state['pos'] = (state['pos'] + 1) % len(state['window'])
+        
+        return self._correlation_from_state()
+    
+    def _correlation_from_state(self):
+        """Derive covariance and correlation matrices from the running sums"""
+        state = self.correlation_state
+        n = len(state['window'])
+        symbols = state['symbols']
+        
+        mean = state['sum'] / n
+        cov = (state['cross'] - n * np.outer(mean, mean)) / (n - 1)
+        std = np.sqrt(np.clip(np.diag(cov), 0, None))
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = cov / np.outer(std, std)
+        corr = np.nan_to_num(np.clip(corr, -1.0, 1.0))
+        np.fill_diagonal(corr, 1.0)
+        
+        self.covariance_matrix = pd.DataFrame(cov, index=symbols, columns=symbols)
+        self.correlation_matrix = pd.DataFrame(corr, index=symbols, columns=symbols)
+        return self.correlation_matrix
+    
+    def find_correlation_clusters(self, threshold=0.7):
+        """Single-linkage hierarchical clusters cut at a correlation threshold"""
+        if self.correlation_matrix is None:
+            return {}
+        
+        corr = self.correlation_matrix.to_numpy()
+        symbols = list(self.correlation_matrix.index)
+        n = len(symbols)
+        adjacency = corr >= threshold
+        
+        # Label propagation over the threshold graph = connected components
+        labels = np.arange(n)
+        while True:
+            new_labels = np.where(adjacency, labels[None, :], n).min(axis=1)
+            if np.array_equal(new_labels, labels):
+                break
+            labels = new_labels
+        
+        # Renumber clusters 1..k, largest first
+        unique, counts = np.unique(labels, return_counts=True)
+        order = unique[np.argsort(-counts, kind='stable')]
+        cluster_ids = {label: idx for idx, label in enumerate(order, 1)}
+        
+        self.clusters = {symbol: cluster_ids[label] for symbol, label in zip(symbols, labels)}
+        return self.clusters
+    
+    def analyze_correlations(self, window=60, threshold=0.7):
+        """Compute correlation matrix and clusters, tag results with their cluster"""
+        if self.calculate_correlation_matrix(window) is None:
+            return
+        
+        self.find_correlation_clusters(threshold)
+        for result in self.results:
+            result['Cluster'] = self.clusters.get(result['Symbol'], 0)
+        
+        multi = sum(1 for c in set(self.clusters.values())
+                    if list(self.clusters.values()).count(c) > 1)
+        print(f"🔗 Correlation clusters: {multi} groups of co-moving stocks (ρ ≥ {threshold})\n")
+    
+    # ========== MEMORY-MAPPED PANEL ==========
+    
+    def export_price_panel(self, path=None, dtype=None):
+        """Write stored price history into a memory-mapped panel file"""
+        path = path or os.path.join(self.cache_dir, 'panel', 'prices.bin')
+        dtype = np.dtype(dtype or self.price_dtype).name
+        if not self.price_data:
+            return None
+        
+        dates = set()
+        for df in self.price_data.values():
+            index = pd.DatetimeIndex(df.index)
+            dates.update((index.tz_localize(None) if index.tz is not None else index).normalize())
+        
+        symbols = [symbol.replace('.NS', '') for symbol in self.price_data]
+        panel = MemmapPricePanel.create(path, sorted(dates), symbols, dtype=dtype)
+        for symbol, df in self.price_data.items():
+            panel.write(symbol.replace('.NS', ''), df)
+        panel.flush()
+        
+        size_mb = os.path.getsize(path) / 1024 ** 2
+        print(f"🗄️  Price panel: {len(panel.dates)} days x {len(symbols)} stocks ({size_mb:.1f} MB, {dtype}) -> {path}\n")
+        return panel
+    
+    def open_price_panel(self, path=None):
+        """Open an existing memory-mapped panel read-only"""
+        return MemmapPricePanel(path or os.path.join(self.cache_dir, 'panel', 'prices.bin'))
+    
+    def calculate_panel_indicators_chunked(self, panel, chunk_size=64):
+        """Latest extended indicators per symbol, streaming the panel in column chunks"""
+        latest = []
+        for symbols, views in panel.iter_chunks(chunk_size=chunk_size):
+            arrays = self.calculate_indicator_arrays(views['High'], views['Low'], views['Close'], views['Volume'])
+            latest.append(pd.DataFrame({key: value[-1] for key, value in arrays.items()}, index=symbols))
+        return pd.concat(latest) if latest else pd.DataFrame()
+    
+    # ========== SECTOR ANALYSIS ==========
+    
+    def fetch_index_history(self, period='1y'):
+        """Fetch the NIFTY 50 index once per run"""
+        if self.index_data is None:
+            try:
+                df = yf.Ticker(self.index_symbol).history(period=period)
+                self.index_data = df if not df.empty else None
+            except Exception:
+                self.index_data = None
+        return self.index_data
+    
+    def calculate_index_relative(self, symbols=None, window=126, lookback=63):
+        """Rolling beta, alpha and relative strength vs the index for every symbol at once
+        
+        One batched least-squares over the returns panel: windowed sums of x, x², y
+        and xy come from cumulative sums, so every symbol and every window date is
+        solved in the same array expression. Missing bars are masked per symbol.
+        """
+        self.index_relative = pd.DataFrame()
+        self.rolling_beta = pd.DataFrame()
+        panel = self.build_price_panel('Close', symbols).astype(np.float64)
+        if panel.empty or len(panel) <= window:
+            return self.index_relative
+        
+        stock_returns = panel.pct_change().iloc[1:]
+        
+        # Market returns: NIFTY 50 index, else the equal-weight universe
+        index_df = self.fetch_index_history()
+        market, benchmark = None, 'equal-weight universe'
+        if index_df is not None:
+            index_close = index_df['Close'].reindex(panel.index).ffill()
+            if index_close.notna().sum() > window:
+                market, benchmark = index_close.pct_change().iloc[1:], self.index_symbol
+        if market is None:
+            market = stock_returns.mean(axis=1)
+        
+        y = stock_returns.to_numpy(dtype=float)
+        x = market.to_numpy(dtype=float)[:, None]
+        mask = ~(np.isnan(y) | np.isnan(x))
+        y = np.where(mask, y, 0.0)
+        x = np.where(mask, x, 0.0)
+        
+        def windowed(values):
+            # Sum over the trailing window via differences of a zero-padded cumsum
+            csum = np.vstack([np.zeros((1, values.shape[1])), np.cumsum(values, axis=0)])
+            return csum[window:] - csum[:-window]
+        
+        n = windowed(mask.astype(float))
+        sx, sy = windowed(x), windowed(y)
+        sxx, sxy = windowed(x * x), windowed(x * y)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            beta = (n * sxy - sx * sy) / (n * sxx - sx * sx)
+            alpha = (sy - beta * sx) / n
+        beta[n < window // 2] = np.nan
+        
+        dates = stock_returns.index[window - 1:]
+        self.rolling_beta = pd.DataFrame(beta, index=dates, columns=panel.columns)
+        
+        # Relative strength: trailing return vs the market over the same lookback
+        stock_growth = panel.iloc[-1] / panel.iloc[-lookback - 1]
+        market_growth = (1 + market.iloc[-lookback:]).prod()
+        
+        self.index_relative = pd.DataFrame({
+            'Beta_Calc': beta[-1],
+            'Alpha': alpha[-1] * 252 * 100,
+            'RS_Index': (stock_growth / market_growth).to_numpy(),
+        }, index=panel.columns)
+        print(f"📈 Index-relative: {window}-day beta/alpha for {len(self.index_relative)} stocks vs {benchmark}")
+        return self.index_relative
+    
+    def analyze_sectors(self, lookback=63):
+        """Sector average scores, relative strength vs the index and rank within sector"""
         df = pd.DataFrame(self.results)
+        panel = self.build_price_panel('Close')
+        if df.empty or panel.empty or len(panel) <= lookback:
+            return self.sector_summary
         
-        # Top 10 Buy (highest combined scores from BUY + STRONG BUY)
-        top_buys = df[df['Recommendation'].isin(['STRONG BUY', 'BUY'])].nlargest(10, 'Combined_Score')
+        # Per-stock trailing return (vectorized over the panel)
+        stock_returns = panel.iloc[-1].astype(np.float64) / panel.iloc[-lookback - 1] - 1
+        df['Return_3M'] = df['Symbol'].map(stock_returns) * 100
         
-        # Top 10 Sell (lowest combined scores from SELL + STRONG SELL)
-        top_sells = df[df['Recommendation'].isin(['STRONG SELL', 'SELL'])].nsmallest(10, 'Combined_Score')
+        # Benchmark: NIFTY 50 index, else the equal-weight universe
+        index_df = self.fetch_index_history()
+        if index_df is not None and len(index_df) > lookback:
+            index_return = index_df['Close'].iloc[-1] / index_df['Close'].iloc[-lookback - 1] - 1
+        else:
+            index_return = stock_returns.mean()
         
-        return top_buys, top_sells
+        grouped = df.groupby('Sector')
+        df['Sector_Rank'] = grouped['Combined_Score'].rank(ascending=False, method='min').astype(int)
+        df['Sector_Size'] = grouped['Symbol'].transform('size')
+        
+        summary = grouped.agg(
+            Stocks=('Symbol', 'size'),
+            Avg_Score=('Combined_Score', 'mean'),
+            Avg_Tech=('Tech_Score_Norm', 'mean'),
+            Avg_Fund=('Fund_Score', 'mean'),
+            Return_3M=('Return_3M', 'mean'),
+        )
+        leaders = df.loc[grouped['Combined_Score'].idxmax(), ['Sector', 'Name']].set_index('Sector')['Name']
+        summary['Leader'] = leaders
+        summary['Relative_Strength'] = (1 + summary['Return_3M'] / 100) / (1 + index_return)
+        self.sector_summary = summary.round(2).sort_values('Avg_Score', ascending=False).reset_index()
+        
+        for result, ret, rank, size in zip(self.results, df['Return_3M'], df['Sector_Rank'], df['Sector_Size']):
+            result['Return_3M'] = round(ret, 2) if pd.notna(ret) else 0
+            result['Sector_Rank'] = int(rank)
+            result['Sector_Size'] = int(size)
+        
+        print(f"🏭 Sector analysis: {len(self.sector_summary)} sectors\n")
+        return self.sector_summary
     
-    def generate_github_pages_html(self, output_file='index.html'):
-        """Generate beautiful HTML for GitHub Pages"""
+    # ========== PORTFOLIO CONSTRUCTION ==========
+    
+    def _project_capped_simplex(self, v, caps):
+        """Project v onto {0 <= w <= caps, sum(w) = 1} by bisection on the shift"""
+        if caps.sum() <= 1.0:
+            return caps.copy()
+        
+        lo, hi = v.min() - caps.max() - 1.0, v.max()
+        for _ in range(100):
+            tau = (lo + hi) / 2
+            if np.clip(v - tau, 0, caps).sum() > 1.0:
+                lo = tau
+            else:
+                hi = tau
+        return np.clip(v - hi, 0, caps)
+    
+    def _project_weights(self, v, caps, sectors, sector_cap):
+        """Project onto long-only weights with position and sector caps"""
+        caps = caps.copy()
+        for _ in range(len(set(sectors)) + 1):
+            w = self._project_capped_simplex(v, caps)
+            over = [sec for sec in set(sectors) if w[sectors == sec].sum() > sector_cap + 1e-9]
+            if not over:
+                break
+            # Freeze members of over-allocated sectors at their scaled-down weights
+            for sec in over:
+                mask = sectors == sec
+                caps[mask] = w[mask] * sector_cap / w[mask].sum()
+        return w
+    
+    def build_portfolio(self, method='risk_parity', max_weight=0.20, sector_cap=0.35,
+                        max_stop_risk=0.02, risk_aversion=5.0, horizon_days=20):
+        """Long-only weights for the BUY / STRONG BUY set (risk parity or mean-variance)"""
         df = pd.DataFrame(self.results)
-        top_buys, top_sells = self.get_top_recommendations()
+        if df.empty:
+            return pd.DataFrame()
         
-        now = self.get_ist_time()
-        time_of_day = "Morning" if now.hour < 12 else "Evening"
+        buys = df[df['Recommendation'].isin(['STRONG BUY', 'BUY'])]
+        if self.covariance_matrix is None:
+            self.calculate_correlation_matrix()
+        if self.covariance_matrix is not None:
+            buys = buys[buys['Symbol'].isin(self.covariance_matrix.index)]
+        if buys.empty:
+            self.portfolio = pd.DataFrame()
+            return self.portfolio
         
-        # Count recommendations
-        strong_buy_count = len(df[df['Recommendation'] == 'STRONG BUY'])
-        buy_count = len(df[df['Recommendation'] == 'BUY'])
-        hold_count = len(df[df['Recommendation'] == 'HOLD'])
-        sell_count = len(df[df['Recommendation'] == 'SELL'])
-        strong_sell_count = len(df[df['Recommendation'] == 'STRONG SELL'])
+        symbols = buys['Symbol'].tolist()
+        n = len(symbols)
+        cov = self.covariance_matrix.loc[symbols, symbols].to_numpy() * horizon_days
+        cov = cov + np.eye(n) * 1e-10
+        sectors = buys['Sector'].to_numpy()
+        
+        # Stop losses act as risk budgets: a stop-out may cost at most max_stop_risk
+        stop_distance = buys['SL_Percentage'].to_numpy(dtype=float) / 100
+        caps = np.full(n, max_weight)
+        with np.errstate(divide='ignore'):
+            caps = np.where(stop_distance > 0, np.minimum(caps, max_stop_risk / stop_distance), caps)
+        
+        if method == 'mean_variance':
+            # Projected gradient ascent on mu'w - (lambda/2) w'Sw
+            mu = buys['Upside'].to_numpy(dtype=float) / 100
+            step = 1.0 / (risk_aversion * np.linalg.norm(cov, 2))
+            w = self._project_weights(np.full(n, 1.0 / n), caps, sectors, sector_cap)
+            for _ in range(500):
+                grad = mu - risk_aversion * cov @ w
+                w_new = self._project_weights(w + step * grad, caps, sectors, sector_cap)
+                if np.abs(w_new - w).max() < 1e-9:
+                    w = w_new
+                    break
+                w = w_new
+        else:
+            # Equal risk contribution by cyclical coordinate descent on the convex
+            # log-barrier form min ½y'Σy - Σ log(y)/n; every step is a positive root
+            var = np.diag(cov)
+            y = 1.0 / np.sqrt(var)
+            for _ in range(500):
+                y_prev = y.copy()
+                for i in range(n):
+                    cross = cov[i] @ y - var[i] * y[i]
+                    y[i] = (-cross + np.sqrt(cross ** 2 + 4 * var[i] / n)) / (2 * var[i])
+                if np.abs(y - y_prev).max() < 1e-10 * y.max():
+                    break
+            w = self._project_weights(y / y.sum(), caps, sectors, sector_cap)
+        
+        if not np.all(np.isfinite(w)):
+            print("⚠️  Portfolio optimizer produced invalid weights - using inverse-volatility weights")
+            w = 1.0 / np.sqrt(np.diag(cov))
+            w = self._project_weights(w / w.sum(), caps, sectors, sector_cap)
+        
+        portfolio_var = w @ cov @ w
+        risk_contrib = w * (cov @ w) / portfolio_var if portfolio_var > 0 else np.zeros(n)
+        
+        self.portfolio = pd.DataFrame({
+            'Symbol': symbols,
+            'Name': buys['Name'].tolist(),
+            'Sector': sectors,
+            'Recommendation': buys['Recommendation'].tolist(),
+            'Weight': np.round(w * 100, 2),
+            'Stop_Loss': buys['Stop_Loss'].tolist(),
+            'SL_Percentage': buys['SL_Percentage'].tolist(),
+            'Risk_Contribution': np.round(risk_contrib * 100, 2),
+        })
+        self.portfolio = self.portfolio[self.portfolio['Weight'] > 0].sort_values('Weight', ascending=False)
+        self.portfolio_method = method
+        self.portfolio_stop_risk = max_stop_risk
+        
+        cash = max(0.0, 100 - self.portfolio['Weight'].sum())
+        print(f"💼 Portfolio ({method}): {len(self.portfolio)} positions, {cash:.1f}% cash\n")
+        return self.portfolio
+    
+    # ========== SUPPORT / RESISTANCE HISTORY ==========
+    
+    def calculate_support_resistance_history(self, window=60, symbols=None):
+        """Per-day support (10th pct of lows) and resistance (90th pct of highs) for every symbol
+        
+        pandas' rolling quantile keeps a sorted window per column in C, so the
+        whole panel goes through in one call per side.
+        """
+        highs = self.build_price_panel('High')
+        lows = self.build_price_panel('Low')
+        if highs.empty:
+            return {'Support': pd.DataFrame(), 'Resistance': pd.DataFrame()}
+        
+        if symbols is not None:
+            highs, lows = highs[symbols], lows[symbols]
+        
+        return {
+            'Support': lows.astype(np.float64).rolling(window).quantile(0.10),
+            'Resistance': highs.astype(np.float64).rolling(window).quantile(0.90),
+        }
+    
+    # ========== VOLATILITY RISK SIZING ==========
+    
+    def calculate_position_sizing(self, capital=None, risk_per_trade=None):
+        """ATR-scaled stops, targets and position sizes for every symbol at once"""
+        capital = self.capital if capital is None else capital
+        risk_per_trade = self.risk_per_trade if risk_per_trade is None else risk_per_trade
+        atr_stop_multiple = self.atr_stop_multiple
+        atr_target_multiple = self.atr_target_multiple
+        
+        df = pd.DataFrame(self.results)
+        indicators = self.calculate_panel_indicators()
+        if df.empty or not indicators:
+            return pd.DataFrame()
+        
+        atr = df['Symbol'].map(indicators['ATR'].iloc[-1]).to_numpy(dtype=float)
+        price = df['Price'].to_numpy(dtype=float)
+        direction = np.where(df['Recommendation'].isin(['STRONG BUY', 'BUY']), 1.0, -1.0)
+        
+        # Risk one ATR multiple per share; never size beyond available capital
+        risk_per_share = atr_stop_multiple * atr
+        with np.errstate(divide='ignore', invalid='ignore'):
+            shares = np.floor(capital * risk_per_trade / risk_per_share)
+            shares = np.minimum(shares, np.floor(capital / price))
+        shares = np.nan_to_num(shares, nan=0.0, posinf=0.0)
+        
+        sizing = pd.DataFrame({
+            'Symbol': df['Symbol'],
+            'ATR_Pct': np.round(atr / price * 100, 2),
+            'ATR_Stop': np.round(price - direction * risk_per_share, 2),
+            'ATR_Target': np.round(price + direction * atr_target_multiple * atr, 2),
+            'Position_Size': shares.astype(int),
+            'Position_Value': np.round(shares * price, 2),
+        })
+        
+        sizing_by_symbol = sizing.set_index('Symbol').to_dict('index')
+        for result in self.results:
+            result.update(sizing_by_symbol.get(result['Symbol'], {}))
+        
+        print(f"📐 Position sizing: ₹{capital:,.0f} capital, {risk_per_trade * 100:.1f}% risk per trade\n")
+        return sizing
+    
+    # ========== MONTE CARLO RISK ==========
+    
+    def simulate_risk(self, n_paths=10000, horizon=20, method='bootstrap', lookback=250,
+                      max_bytes=256 * 1024 ** 2, seed=0):
+        """Simulate price paths for every symbol: P(target before stop), holding time, 95% VaR"""
+        df = pd.DataFrame(self.results)
+        panel = self.build_price_panel('Close')
+        if df.empty or panel.empty:
+            return pd.DataFrame()
+        
+        df = df[df['Symbol'].isin(panel.columns)]
+        symbols = df['Symbol'].tolist()
+        returns = np.log(panel[symbols].astype(np.float64)).diff().iloc[1:].tail(lookback).fillna(0.0).to_numpy()
+        n_symbols, n_hist = len(symbols), len(returns)
+        
+        # Barriers as log-distances from the current price
+        price = df['Price'].to_numpy(dtype=float)
+        is_long = df['Recommendation'].isin(['STRONG BUY', 'BUY']).to_numpy()
+        target_dist = np.log(df['Target_1'].to_numpy(dtype=float) / price)
+        stop_dist = np.log(df['Stop_Loss'].to_numpy(dtype=float) / price)
+        direction = np.where(is_long, 1.0, -1.0)
         
-        html = f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>NIFTY 50 Stock Analysis - Live Report</title>
-    <style>
-        * {{
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }}
+        mu = returns.mean(axis=0)
+        sigma = returns.std(axis=0)
+        rng = np.random.default_rng(seed)
         
-        body {{
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            padding: 20px;
-            min-height: 100vh;
-        }}
+        # Memory-bounded chunking: blocks of symbols, and of paths if one symbol is too big
+        budget = max(horizon, max_bytes // (8 * 4))
+        path_chunk = min(n_paths, max(1, budget // horizon))
+        symbol_block = max(1, min(n_symbols, budget // (path_chunk * horizon)))
         
-        .container {{
-            max-width: 1400px;
-            margin: 0 auto;
-            background: white;
-            border-radius: 20px;
-            box-shadow: 0 20px 60px rgba(0,0,0,0.3);
-            overflow: hidden;
-        }}
+        p_target = np.zeros(n_symbols)
+        hold_days = np.zeros(n_symbols)
+        var_95 = np.zeros(n_symbols)
         
-        .header {{
-            background: linear-gradient(135deg, #1e40af 0%, #3b82f6 100%);
-            color: white;
-            padding: 40px;
-            text-align: center;
-        }}
+        for s0 in range(0, n_symbols, symbol_block):
+            s1 = min(n_symbols, s0 + symbol_block)
+            cols = np.arange(s0, s1)
+            final_pnl = np.empty((s1 - s0, n_paths))
+            hits = np.zeros(s1 - s0)
+            days = np.zeros(s1 - s0)
+            
+            for p0 in range(0, n_paths, path_chunk):
+                p1 = min(n_paths, p0 + path_chunk)
+                shape = (s1 - s0, p1 - p0, horizon)
+                
+                # One (symbols x paths x horizon) array of log-return increments
+                if method == 'gbm':
+                    steps = rng.standard_normal(shape) * sigma[cols, None, None]
+                    steps += (mu[cols] - 0.5 * sigma[cols] ** 2)[:, None, None]
+                else:
+                    steps = returns[rng.integers(0, n_hist, size=shape), cols[:, None, None]]
+                paths = np.cumsum(steps, axis=2)
+                
+                # Flip shorts so "up" always means towards the target
+                signed = paths * direction[cols, None, None]
+                up = (target_dist[cols] * direction[cols])[:, None, None]
+                down = (stop_dist[cols] * direction[cols])[:, None, None]
+                
+                hit_target = signed >= up
+                hit_stop = signed <= down
+                t_target = np.where(hit_target.any(axis=2), hit_target.argmax(axis=2), horizon)
+                t_stop = np.where(hit_stop.any(axis=2), hit_stop.argmax(axis=2), horizon)
+                
+                hits += (t_target < t_stop).sum(axis=1)
+                days += (np.minimum(np.minimum(t_target, t_stop), horizon - 1) + 1).sum(axis=1)
+                final_pnl[:, p0:p1] = direction[cols, None] * np.expm1(paths[:, :, -1])
+            
+            p_target[s0:s1] = hits / n_paths
+            hold_days[s0:s1] = days / n_paths
+            var_95[s0:s1] = -np.quantile(final_pnl, 0.05, axis=1)
         
-        .header h1 {{
-            font-size: 42px;
-            margin-bottom: 10px;
-            text-shadow: 2px 2px 4px rgba(0,0,0,0.2);
-        }}
+        risk = pd.DataFrame({
+            'Symbol': symbols,
+            'P_Target': np.round(p_target * 100, 1),
+            'Exp_Hold_Days': np.round(hold_days, 1),
+            'VaR_95': np.round(var_95 * 100, 2),
+        })
         
-        .header p {{
-            font-size: 18px;
-            opacity: 0.9;
-        }}
+        risk_by_symbol = risk.set_index('Symbol').to_dict('index')
+        for result in self.results:
+            result.update(risk_by_symbol.get(result['Symbol'], {}))
         
-        .last-updated {{
-            background: rgba(255,255,255,0.2);
-            padding: 10px 20px;
-            border-radius: 25px;
-            display: inline-block;
-            margin-top: 15px;
-            font-size: 14px;
-        }}
+        print(f"🎲 Monte Carlo risk: {n_paths:,} {method} paths x {horizon} days for {n_symbols} stocks\n")
+        return risk
+    
+    # ========== ALERTS ==========
+    
+    def load_alert_rules(self):
+        """Load user-defined alert rules, falling back to the defaults"""
+        try:
+            with open(self.alert_rules_file, 'r', encoding='utf-8') as f:
+                rules = json.load(f)
+        except (OSError, ValueError):
+            return DEFAULT_ALERT_RULES
+        if not isinstance(rules, list):
+            print(f"⚠️  {self.alert_rules_file} must hold a list of rules - using the defaults")
+            return DEFAULT_ALERT_RULES
+        return self.validate_alert_rules(rules)
+    
+    def validate_alert_rules(self, rules):
+        """Drop malformed rules with a warning so one bad rule can't abort the run"""
+        valid = []
+        for position, rule in enumerate(rules, 1):
+            problem = self._alert_rule_problem(rule)
+            if problem:
+                label = rule.get('id', f"#{position}") if isinstance(rule, dict) else f"#{position}"
+                print(f"⚠️  Skipping alert rule {label}: {problem}")
+            else:
+                valid.append(rule)
+        return valid
+    
+    def _alert_rule_problem(self, rule):
+        """Why a rule can't be evaluated, or None if it is well formed"""
+        if not isinstance(rule, dict):
+            return "not an object"
+        if not isinstance(rule.get('id'), str) or not rule['id']:
+            return "missing 'id'"
+        if not isinstance(rule.get('field'), str) or not rule['field']:
+            return "missing 'field'"
+        kind = rule.get('type', 'threshold')
+        if kind not in ('threshold', 'cross_above', 'cross_below', 'change'):
+            return f"unknown type {kind!r}"
+        if kind == 'change':
+            for key in ('from', 'to'):
+                if not isinstance(rule.get(key, []), list) or not all(isinstance(v, str) for v in rule.get(key, [])):
+                    return f"'{key}' must be a list of strings"
+        else:
+            if rule.get('op', '>') not in ('>', '>=', '<', '<='):
+                return f"unknown op {rule.get('op')!r}"
+            if 'ref' in rule and not isinstance(rule['ref'], str):
+                return "'ref' must be a field name"
+            try:
+                float(rule.get('value', 0))
+            except (TypeError, ValueError):
+                return "'value' must be a number"
+        try:
+            float(rule.get('cooldown_hours', 24))
+        except (TypeError, ValueError):
+            return "'cooldown_hours' must be a number"
+        if not isinstance(rule.get('message', ''), str):
+            return "'message' must be a string"
+        return None
+    
+    def save_results_snapshot(self):
+        """Store this run's results so the next run can detect crossovers"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = os.path.join(self.cache_dir, 'previous_results.json')
+        self._atomic_write(path, json.dumps(self.results, default=str))
+    
+    def load_results_snapshot(self):
+        """Load the previous run's results"""
+        path = os.path.join(self.cache_dir, 'previous_results.json')
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+    
+    def evaluate_alerts(self, rules=None, previous=None):
+        """Evaluate all alert rules against current and previous results in one pass"""
+        rules = self.load_alert_rules() if rules is None else self.validate_alert_rules(rules)
+        previous = self.load_results_snapshot() if previous is None else previous
+        current = pd.DataFrame(self.results)
+        if current.empty or not rules:
+            self.alerts = []
+            return self.alerts
         
-        .summary-grid {{
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-            gap: 20px;
-            padding: 40px;
-            background: #f8f9fa;
-        }}
+        symbols = current['Symbol']
+        prev = pd.DataFrame(previous)
+        prev = prev.set_index('Symbol').reindex(symbols) if not prev.empty else pd.DataFrame(index=symbols)
         
-        .summary-card {{
-            background: white;
-            padding: 25px;
-            border-radius: 15px;
-            box-shadow: 0 4px 15px rgba(0,0,0,0.1);
-            text-align: center;
-            transition: transform 0.3s ease;
-        }}
+        numeric_rules = [r for r in rules if r.get('type', 'threshold') != 'change']
+        change_rules = [r for r in rules if r.get('type') == 'change']
+        fired = []
         
-        .summary-card:hover {{
-            transform: translateY(-5px);
-        }}
+        # Numeric rules: gather every rule's lhs/rhs as (symbols x rules) matrices
+        if numeric_rules:
+            fields = sorted({r['field'] for r in numeric_rules} | {r['ref'] for r in numeric_rules if 'ref' in r})
+            cur_values = current.reindex(columns=fields).apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+            prev_values = prev.reindex(columns=fields).apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+            field_idx = {f: i for i, f in enumerate(fields)}
+            
+            lhs = np.array([field_idx[r['field']] for r in numeric_rules])
+            rhs = np.array([field_idx.get(r.get('ref'), -1) for r in numeric_rules])
+            const = np.array([float(r.get('value', 0)) for r in numeric_rules])
+            kinds = [r.get('type', 'threshold') for r in numeric_rules]
+            ops = [{'cross_above': '>', 'cross_below': '<'}.get(k, r.get('op', '>')) for k, r in zip(kinds, numeric_rules)]
+            edge = np.array([k != 'threshold' for k in kinds])
+            is_gt, is_ge, is_lt = (np.array([op == o for op in ops]) for o in ('>', '>=', '<'))
+            
+            def condition(values):
+                diff = values[:, lhs] - np.where(rhs >= 0, values[:, np.maximum(rhs, 0)], const)
+                with np.errstate(invalid='ignore'):
+                    met = np.where(is_gt, diff > 0, np.where(is_ge, diff >= 0, np.where(is_lt, diff < 0, diff <= 0)))
+                return met, ~np.isnan(diff)
+            
+            cur_met, cur_valid = condition(cur_values)
+            prev_met, prev_valid = condition(prev_values)
+            hits = cur_met & cur_valid & (~edge | (prev_valid & ~prev_met))
+            fired += [(numeric_rules[j], i) for i, j in zip(*np.nonzero(hits))]
         
-        .summary-card .number {{
-            font-size: 48px;
-            font-weight: bold;
-            color: #1e40af;
-            margin-bottom: 10px;
-        }}
+        # Categorical transitions (e.g. HOLD -> BUY) via category bitmasks
+        if change_rules:
+            fields = sorted({r['field'] for r in change_rules})
+            categories = {}
+            def encode(frame):
+                values = frame.reindex(columns=fields).to_numpy(dtype=object)
+                return np.vectorize(lambda v: categories.setdefault(v, len(categories)) if isinstance(v, str) else -1,
+                                    otypes=[np.int64])(values)
+            cur_codes = encode(current)
+            prev_codes = encode(prev)
+            
+            def bits(values):
+                return sum(1 << categories.setdefault(v, len(categories)) for v in values)
+            col = np.array([fields.index(r['field']) for r in change_rules])
+            from_bits = np.array([bits(r.get('from', [])) or -1 for r in change_rules], dtype=np.int64)
+            to_bits = np.array([bits(r.get('to', [])) or -1 for r in change_rules], dtype=np.int64)
+            
+            cur_c, prev_c = cur_codes[:, col], prev_codes[:, col]
+            hits = ((prev_c >= 0) & (cur_c != prev_c)
+                    & ((np.left_shift(1, np.maximum(prev_c, 0)) & from_bits) != 0)
+                    & ((np.left_shift(1, np.maximum(cur_c, 0)) & to_bits) != 0))
+            fired += [(change_rules[j], i) for i, j in zip(*np.nonzero(hits))]
         
-        .summary-card .label {{
-            font-size: 14px;
-            color: #6b7280;
-            text-transform: uppercase;
-            letter-spacing: 1px;
-        }}
+        # Deduplicate and rate-limit against the persisted alert state
+        self.alert_state = self.load_alert_state()
+        now = self.get_ist_time()
+        alerts = []
+        for rule, row_idx in fired:
+            row = self.results[row_idx]
+            key = f"{rule['id']}|{row['Symbol']}"
+            last = self.alert_state.get(key)
+            cooldown = float(rule.get('cooldown_hours', 24)) * 3600
+            if last and (now - datetime.fromisoformat(last)).total_seconds() < cooldown:
+                continue
+            try:
+                message = rule.get('message', '{Name}: ' + rule['id']).format(**row)
+            except (KeyError, IndexError, AttributeError, TypeError, ValueError):
+                message = f"{row['Name']}: {rule['id']}"
+            alerts.append({'Rule': rule['id'], 'Symbol': row['Symbol'], 'Name': row['Name'],
+                           'Message': message, 'Key': key})
         
-        .content {{
-            padding: 40px;
-        }}
+        self.alerts = alerts
+        print(f"🔔 Alerts: {len(alerts)} triggered from {len(rules)} rules\n")
+        return self.alerts
+    
+    def load_alert_state(self):
+        """Load last-fired timestamps per rule and symbol"""
+        path = os.path.join(self.cache_dir, 'alert_state.json')
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def commit_alert_state(self):
+        """Mark delivered alerts so they are rate-limited on later runs"""
+        if not self.alerts:
+            return
+        now = self.get_ist_time().isoformat()
+        for alert in self.alerts:
+            self.alert_state[alert['Key']] = now
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = os.path.join(self.cache_dir, 'alert_state.json')
+        self._atomic_write(path, json.dumps(self.alert_state))
+    
+    def _synced_ranker(self):
+        """The streaming ranker, rebuilt if results were replaced outside the scoring loop"""
+        held = self.ranker.top_buys() + self.ranker.top_sells()
+        in_sync = self.ranker.count == len(self.results) and all(
+            seq < len(self.results) and self.results[seq] is result for seq, result in held)
+        if not in_sync:
+            self.ranker = StreamingTopK(k=self.ranker.k)
+            self.ranker.extend(self.results)
+        return self.ranker
+    
+    def get_top_recommendations(self):
+        """Get top 10 buy and sell recommendations"""
+        df = pd.DataFrame(self.results)
+        ranker = self._synced_ranker()
         
-        .section {{
-            margin-bottom: 50px;
-        }}
+        # Top 10 Buy (highest combined scores from BUY + STRONG BUY)
+        top_buys = df.loc[[seq for seq, _ in ranker.top_buys()]]
         
-        .section-title {{
-            font-size: 32px;
-            margin-bottom: 25px;
-            padding-bottom: 15px;
-            border-bottom: 4px solid #15803d;
-            color: #15803d;
-        }}
+        # Top 10 Sell (lowest combined scores from SELL + STRONG SELL)
+        top_sells = df.loc[[seq for seq, _ in ranker.top_sells()]]
         
-        .section-title.sell {{
-            border-bottom-color: #dc2626;
-            color: #dc2626;
-        }}
+        # Flag buys that share a correlation cluster with another buy
+        if 'Cluster' in top_buys.columns:
+            cluster_counts = top_buys['Cluster'].map(top_buys['Cluster'].value_counts())
+            top_buys = top_buys.assign(Concentrated=(top_buys['Cluster'] > 0) & (cluster_counts > 1))
+        else:
+            top_buys = top_buys.assign(Concentrated=False)
         
-        table {{
-            width: 100%;
-            border-collapse: collapse;
-            background: white;
-            border-radius: 10px;
-            overflow: hidden;
-            box-shadow: 0 4px 15px rgba(0,0,0,0.1);
-        }}
+        return top_buys, top_sells
+    
+    def generate_provisional_html(self, done, total, phase='scoring'):
+        """Small interim page with the current top lists while a run is in progress"""
+        sections = ''
+        for title, theme, ranked in (('🟢 TOP BUYS SO FAR', '', self.ranker.top_buys()),
+                                     ('🔴 TOP SELLS SO FAR', 'sell', self.ranker.top_sells())):
+            rows = ''.join(f"""
+                        <tr>
+                            <td class="stock-name">{self._stock_link(r)}</td>
+                            <td>₹{r['Price']:,.0f}</td>
+                            <td class="rating">{r['Rating']}</td>
+                            <td><strong>{r['Combined_Score']:.0f}</strong></td>
+                        </tr>""" for _, r in ranked)
+            sections += f"""
+            <div class="section">
+                <h2 class="section-title {theme}">{title}</h2>
+                <table>
+                    <thead><tr><th>Stock</th><th>Price</th><th>Rating</th><th>Score</th></tr></thead>
+                    <tbody>{rows}
+                    </tbody>
+                </table>
+            </div>
+"""
         
-        thead {{
-            background: #15803d;
-            color: white;
-        }}
+        return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <meta http-equiv="refresh" content="10">
+    <title>NIFTY 50 Stock Analysis - Run in Progress</title>
+    <style>{REPORT_CSS}    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>📊 NIFTY 50 Stock Analysis</h1>
+            <p>⏳ Provisional ranking: {done}/{total} stocks {'fetched (before data-quality checks)' if phase == 'fetching' else 'scored'}</p>
+            <div class="last-updated">
+                Updated: {self.get_ist_time().strftime('%d %b %Y, %I:%M:%S %p')} IST
+            </div>
+        </div>
+        <div class="content">
+{sections}
+        </div>
+    </div>
+</body>
+</html>
+"""
+    
+    # ========== STOCK DETAIL PAGES ==========
+    
+    def _stock_page_payload(self, result, chart_days=180):
+        """Inputs for one detail page: the result row plus chart series"""
+        df = self.price_data.get(f"{result['Symbol']}.NS")
+        chart = {'Close': [], 'SMA_20': [], 'SMA_50': [], 'SMA_200': [], 'RSI': []}
+        as_of = ''
         
-        thead.sell {{
-            background: #dc2626;
-        }}
+        if df is not None and not df.empty:
+            close = df['Close'].astype(np.float64)
+            series = {
+                'Close': close,
+                'SMA_20': close.rolling(window=20).mean(),
+                'SMA_50': close.rolling(window=50).mean(),
+                'SMA_200': close.rolling(window=200).mean(),
+                'RSI': self.calculate_rsi_series(close),
+            }
+            for key, values in series.items():
+                tail = values.tail(chart_days).round(2)
+                chart[key] = [None if pd.isna(v) else float(v) for v in tail]
+            as_of = df.index[-1].strftime('%d %b %Y')
         
-        th {{
-            padding: 18px 15px;
-            text-align: left;
-            font-size: 13px;
-            font-weight: 600;
-            text-transform: uppercase;
-            letter-spacing: 0.5px;
-        }}
+        return {'result': result, 'chart': chart, 'as_of': as_of}
+    
+    def generate_stock_pages(self, output_dir='stocks', workers=None):
+        """Render one detail page per stock in parallel, rewriting only changed pages"""
+        os.makedirs(output_dir, exist_ok=True)
+        manifest_path = os.path.join(output_dir, 'manifest.json')
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
         
-        td {{
-            padding: 16px 15px;
-            border-bottom: 1px solid #e5e7eb;
-        }}
+        # Content hash per page decides whether it needs re-rendering
+        pending = []
+        new_manifest = {}
+        for result in self.results:
+            payload = self._stock_page_payload(result)
+            digest = hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+            path = os.path.join(output_dir, f"{result['Symbol']}.html")
+            new_manifest[result['Symbol']] = digest
+            if manifest.get(result['Symbol']) != digest or not os.path.exists(path):
+                pending.append((path, payload))
         
-        tr:hover {{
-            background-color: #f9fafb;
-        }}
+        if pending:
+            payloads = [payload for _, payload in pending]
+            try:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    pages = list(pool.map(render_stock_page, payloads, chunksize=8))
+            except (OSError, RuntimeError):
+                pages = [render_stock_page(payload) for payload in payloads]
+            
+            for (path, _), page in zip(pending, pages):
+                self._atomic_write(path, page)
         
-        .stock-name {{
-            font-weight: 600;
-            color: #1f2937;
-        }}
+        # Drop pages for symbols no longer in the results
+        for symbol in set(manifest) - set(new_manifest):
+            stale = os.path.join(output_dir, f"{symbol}.html")
+            if os.path.exists(stale):
+                os.remove(stale)
         
-        .rating {{
-            font-weight: bold;
-            font-size: 12px;
-        }}
+        self._atomic_write(manifest_path, json.dumps(new_manifest, indent=1, sort_keys=True))
         
-        .upside-positive {{
-            color: #15803d;
-            font-weight: bold;
-            font-size: 16px;
-        }}
+        print(f"✅ Stock pages: {len(pending)} rendered, {len(self.results) - len(pending)} unchanged ({output_dir}/)\n")
+        return len(pending)
+    
+    def _stock_link(self, row):
+        """Stock name linked to its detail page"""
+        return f'<a href="stocks/{quote(str(row["Symbol"]))}.html">{row["Name"]}</a>'
+    
+    # ========== COMPACT STATIC SITE ==========
+    
+    def get_report_data(self):
+        """Compact JSON payload: all results as row arrays plus pre-built report sections"""
+        df = pd.DataFrame(self.results)
+        top_buys, top_sells = self.get_top_recommendations()
+        now = self.get_ist_time()
         
-        .upside-negative {{
-            color: #dc2626;
-            font-weight: bold;
-            font-size: 16px;
-        }}
+        columns = list(df.columns)
+        rows = [[None if pd.isna(v) else (v.item() if hasattr(v, 'item') else v) for v in row]
+                for row in df.itertuples(index=False)]
+        counts = df['Recommendation'].value_counts()
         
-        .rsi-overbought {{
-            color: #dc2626;
-            font-weight: bold;
-            font-size: 16px;
-        }}
+        sections = []
+        if self.alerts:
+            sections.append({'title': '🔔 ALERTS', 'theme': 'alert', 'columns': ['Stock', 'Alert'],
+                             'rows': [[a['Name'], a['Message']] for a in self.alerts],
+                             'symbols': [a['Symbol'] for a in self.alerts]})
+        dq_issues = self.get_data_quality_issues()
+        if dq_issues:
+            sections.append({'title': '🧪 DATA QUALITY', 'theme': 'alert', 'columns': ['Stock', 'Status', 'Reasons'],
+                             'rows': [[r['Name'], r['DQ_Status'], r['DQ_Flags']] for r in dq_issues],
+                             'symbols': [r['Symbol'] for r in dq_issues]})
+        if not top_buys.empty:
+            sections.append({
+                'title': '🟢 TOP 10 BUY RECOMMENDATIONS', 'theme': '',
+                'columns': ['Stock', 'Price', 'Rating', 'Score', 'Upside %', 'Target', 'Stop Loss', 'Hit %', 'VaR 95%', 'Quality'],
+                'rows': [[r['Name'], f"₹{r['Price']:,.0f}", r['Rating'], f"{r['Combined_Score']:.0f}", f"{r['Upside']:+.1f}%",
+                          f"₹{r['Target_1']:,.0f}", f"₹{r['Stop_Loss']:,.0f}", self._format_risk(r, 'P_Target'),
+                          self._format_risk(r, 'VaR_95'), r['Quality']] for _, r in top_buys.iterrows()],
+                'symbols': top_buys['Symbol'].tolist(),
+                'badges': [f"Cluster {r['Cluster']}" if r['Concentrated'] else None for _, r in top_buys.iterrows()],
+            })
+            if top_buys['Concentrated'].any():
+                sections[-1]['note'] = (f"⚠️ {int(top_buys['Concentrated'].sum())} picks move together "
+                                        "(same correlation cluster) - consider diversifying.")
+        if not top_sells.empty:
+            sections.append({
+                'title': '🔴 TOP 10 SELL RECOMMENDATIONS', 'theme': 'sell',
+                'columns': ['Stock', 'Price', 'Rating', 'Score', 'RSI', 'MACD', 'Hit %', 'VaR 95%', 'Quality'],
+                'rows': [[r['Name'], f"₹{r['Price']:,.0f}", r['Rating'], f"{r['Combined_Score']:.0f}", f"{r['RSI']:.0f}",
+                          r['MACD'], self._format_risk(r, 'P_Target'), self._format_risk(r, 'VaR_95'), r['Quality']]
+                         for _, r in top_sells.iterrows()],
+                'symbols': top_sells['Symbol'].tolist(),
+            })
+        if not self.sector_summary.empty:
+            sections.append({
+                'title': '🏭 SECTOR OVERVIEW', 'theme': 'info',
+                'columns': ['Sector', 'Stocks', 'Avg Score', '3M Return', 'RS vs NIFTY', 'Leader'],
+                'rows': [[r['Sector'], int(r['Stocks']), f"{r['Avg_Score']:.0f}", f"{r['Return_3M']:+.1f}%",
+                          f"{r['Relative_Strength']:.2f}", r['Leader']] for _, r in self.sector_summary.iterrows()],
+            })
+        if not self.portfolio.empty:
+            method_label = "Risk Parity" if self.portfolio_method == 'risk_parity' else "Mean-Variance"
+            cash = max(0.0, 100 - self.portfolio['Weight'].sum())
+            sections.append({
+                'title': f'💼 SUGGESTED PORTFOLIO ({method_label})', 'theme': 'info',
+                'columns': ['Stock', 'Sector', 'Weight', 'Stop Loss', 'Risk Share'],
+                'rows': [[r['Name'], r['Sector'], f"{r['Weight']:.1f}%", f"₹{r['Stop_Loss']:,.0f} ({r['SL_Percentage']:.1f}%)",
+                          f"{r['Risk_Contribution']:.1f}%"] for _, r in self.portfolio.iterrows()],
+                'symbols': self.portfolio['Symbol'].tolist(),
+                'note': (f"Cash: {cash:.1f}% | Position weights are capped so a stop-out costs at most "
+                         f"{self.portfolio_stop_risk * 100:.0f}% of capital."),
+            })
+        if not top_buys.empty and 'Position_Size' in top_buys.columns:
+            sections.append({
+                'title': '📐 POSITION SIZING (ATR-BASED)', 'theme': 'info',
+                'columns': ['Stock', 'Price', 'ATR %', 'ATR Stop', 'ATR Target', 'Qty', 'Value'],
+                'rows': [[r['Name'], f"₹{r['Price']:,.0f}", f"{r['ATR_Pct']:.1f}%", f"₹{r['ATR_Stop']:,.0f}",
+                          f"₹{r['ATR_Target']:,.0f}", f"{r['Position_Size']:,.0f}", f"₹{r['Position_Value']:,.0f}"]
+                         for _, r in top_buys.iterrows()],
+                'symbols': top_buys['Symbol'].tolist(),
+                'note': (f"Sized for ₹{self.capital:,.0f} capital risking {self.risk_per_trade * 100:.1f}% per trade; "
+                         f"stops at {self.atr_stop_multiple:g}×ATR, targets at {self.atr_target_multiple:g}×ATR."),
+            })
         
-        .rsi-oversold {{
-            color: #15803d;
-            font-weight: bold;
-            font-size: 16px;
-        }}
+        return {
+            'time_of_day': "Morning" if now.hour < 12 else "Evening",
+            'updated': now.strftime('%d %b %Y, %I:%M %p'),
+            'next_update': "4:30 PM" if now.hour < 12 else "9:30 AM (Next Day)",
+            'summary': [['Stocks Analyzed', len(self.results)],
+                        ['Strong Buy', int(counts.get('STRONG BUY', 0))],
+                        ['Buy', int(counts.get('BUY', 0))],
+                        ['Hold', int(counts.get('HOLD', 0))]],
+            'sections': sections,
+            'columns': columns,
+            'rows': rows,
+        }
+    
+    def _write_fingerprinted_asset(self, directory, stem, extension, content):
+        """Write an asset named by its content hash; remove older fingerprints"""
+        digest = hashlib.sha256(content.encode('utf-8')).hexdigest()[:10]
+        filename = f"{stem}.{digest}.{extension}"
+        path = os.path.join(directory, filename)
         
-        .rsi-neutral {{
-            color: #f59e0b;
-            font-weight: bold;
-            font-size: 16px;
-        }}
+        if not os.path.exists(path):
+            self._atomic_write(path, content)
+        for old in os.listdir(directory):
+            if old.startswith(f"{stem}.") and old.endswith(f".{extension}") and old != filename:
+                os.remove(os.path.join(directory, old))
+        return filename
+    
+    def generate_compact_site(self, output_dir='.'):
+        """Static site: fingerprinted CSS/JS assets, a small HTML shell and a compressed JSON payload"""
+        assets_dir = os.path.join(output_dir, 'assets')
+        data_dir = os.path.join(output_dir, 'data')
+        os.makedirs(assets_dir, exist_ok=True)
+        os.makedirs(data_dir, exist_ok=True)
         
-        .quality-badge {{
-            padding: 6px 14px;
-            border-radius: 20px;
-            color: white;
-            font-size: 11px;
-            font-weight: bold;
-            display: inline-block;
-        }}
+        # Assets only change (and get a new name) when the template changes
+        css_file = self._write_fingerprinted_asset(assets_dir, 'style', 'css', REPORT_CSS)
+        js_file = self._write_fingerprinted_asset(assets_dir, 'app', 'js', REPORT_JS)
         
-        .quality-excellent {{ background: #15803d; }}
-        .quality-good {{ background: #3b82f6; }}
-        .quality-average {{ background: #f59e0b; }}
-        .quality-poor {{ background: #dc2626; }}
+        # Per-run data, plus precompressed variants for servers/CDNs that can use them
+        payload = json.dumps(self.get_report_data(), separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+        data_path = os.path.join(data_dir, 'report.json')
+        self._atomic_write(data_path, payload)
+        self._atomic_write(data_path + '.gz', gzip.compress(payload, compresslevel=9, mtime=0))
+        if brotli is not None:
+            self._atomic_write(data_path + '.br', brotli.compress(payload))
         
-        .disclaimer {{
-            background: #fef3c7;
-            border: 3px solid #f59e0b;
-            border-radius: 15px;
-            padding: 30px;
-            margin: 40px 0;
-        }}
+        data_version = hashlib.sha256(payload).hexdigest()[:10]
+        shell = f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>NIFTY 50 Stock Analysis - Live Report</title>
+    <link rel="stylesheet" href="assets/{css_file}">
+</head>
+<body>
+    <div id="app" data-src="data/report.json?v={data_version}">Loading report...</div>
+    <script src="assets/{js_file}" defer></script>
+</body>
+</html>
+"""
+        index_path = os.path.join(output_dir, 'index.html')
+        self._atomic_write(index_path, shell)
         
-        .disclaimer h3 {{
-            color: #dc2626;
-            margin-bottom: 15px;
-            font-size: 20px;
-        }}
+        print(f"✅ Compact site generated: {index_path} + data/report.json "
+              f"({len(payload) / 1024:.1f} KB, {os.path.getsize(data_path + '.gz') / 1024:.1f} KB gzipped)\n")
+        return index_path
+    
+    def _format_risk(self, row, column):
+        """Format a Monte Carlo column for the report tables"""
+        value = row.get(column)
+        if value is None or pd.isna(value):
+            return "-"
+        return f"{value:.0f}%" if column == 'P_Target' else f"{value:.1f}%"
+    
+    def generate_github_pages_html(self, output_file='index.html'):
+        """Generate beautiful HTML for GitHub Pages"""
+        df = pd.DataFrame(self.results)
+        top_buys, top_sells = self.get_top_recommendations()
         
-        .disclaimer ul {{
-            margin-left: 25px;
-            margin-top: 15px;
-            line-height: 1.8;
-        }}
+        now = self.get_ist_time()
+        time_of_day = "Morning" if now.hour < 12 else "Evening"
         
-        .footer {{
-            background: #1f2937;
-            color: white;
-            text-align: center;
-            padding: 30px;
-        }}
+        # Count recommendations
+        strong_buy_count = len(df[df['Recommendation'] == 'STRONG BUY'])
+        buy_count = len(df[df['Recommendation'] == 'BUY'])
+        hold_count = len(df[df['Recommendation'] == 'HOLD'])
+        sell_count = len(df[df['Recommendation'] == 'SELL'])
+        strong_sell_count = len(df[df['Recommendation'] == 'STRONG SELL'])
         
-        .footer p {{
-            margin: 5px 0;
-        }}
-        
-        @media (max-width: 768px) {{
-            .header h1 {{ font-size: 28px; }}
-            .summary-grid {{ grid-template-columns: repeat(2, 1fr); }}
-            table {{ font-size: 12px; }}
-            th, td {{ padding: 10px 8px; }}
-        }}
-    </style>
+        html = f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>NIFTY 50 Stock Analysis - Live Report</title>
+    <style>{REPORT_CSS}    </style>
 </head>
 <body>
     <div class="container">
@@ -712,6 +3165,39 @@ class Nifty50CompleteAnalyzer:
         <div class="content">
 """
         
+        # Alerts
+        if self.alerts:
+            html += """
+            <div class="section">
+                <h2 class="section-title alert">🔔 ALERTS</h2>
+                <ul class="alert-list">
+"""
+            for alert in self.alerts:
+                html += f"""
+                    <li>{alert['Message']}</li>
+"""
+            html += """
+                </ul>
+            </div>
+"""
+        
+        # Data quality: quarantined stocks are held at HOLD until their data is clean
+        dq_issues = self.get_data_quality_issues()
+        if dq_issues:
+            html += """
+            <div class="section">
+                <h2 class="section-title alert">🧪 DATA QUALITY</h2>
+                <ul class="alert-list">
+"""
+            for r in dq_issues:
+                html += f"""
+                    <li><strong>{r['Name']}</strong> {r['DQ_Status']}: {r['DQ_Flags']}</li>
+"""
+            html += """
+                </ul>
+            </div>
+"""
+        
         # Top 10 Buy Recommendations
         if not top_buys.empty:
             html += """
@@ -727,6 +3213,8 @@ class Nifty50CompleteAnalyzer:
                             <th>Upside %</th>
                             <th>Target</th>
                             <th>Stop Loss</th>
+                            <th>Hit %</th>
+                            <th>VaR 95%</th>
                             <th>Quality</th>
                         </tr>
                     </thead>
@@ -742,21 +3230,31 @@ class Nifty50CompleteAnalyzer:
                     'Poor': 'quality-poor'
                 }.get(row['Quality'], 'quality-average')
                 
+                cluster_badge = f'<span class="cluster-badge">Cluster {row["Cluster"]}</span>' if row['Concentrated'] else ''
+                
                 html += f"""
                         <tr>
-                            <td class="stock-name">{row['Name']}</td>
+                            <td class="stock-name">{self._stock_link(row)}{cluster_badge}</td>
                             <td>₹{row['Price']:,.0f}</td>
                             <td class="rating">{row['Rating']}</td>
                             <td><strong>{row['Combined_Score']:.0f}</strong></td>
                             <td class="{upside_class}">{row['Upside']:+.1f}%</td>
                             <td>₹{row['Target_1']:,.0f}</td>
                             <td>₹{row['Stop_Loss']:,.0f}</td>
+                            <td>{self._format_risk(row, 'P_Target')}</td>
+                            <td>{self._format_risk(row, 'VaR_95')}</td>
                             <td><span class="quality-badge {quality_class}">{row['Quality']}</span></td>
                         </tr>
 """
             html += """
                     </tbody>
                 </table>
+"""
+            if top_buys['Concentrated'].any():
+                html += f"""
+                <p>⚠️ {int(top_buys['Concentrated'].sum())} picks move together (same correlation cluster) - consider diversifying.</p>
+"""
+            html += """
             </div>
 """
         
@@ -774,6 +3272,8 @@ class Nifty50CompleteAnalyzer:
                             <th>Score</th>
                             <th>RSI</th>
                             <th>MACD</th>
+                            <th>Hit %</th>
+                            <th>VaR 95%</th>
                             <th>Quality</th>
                         </tr>
                     </thead>
@@ -796,12 +3296,14 @@ class Nifty50CompleteAnalyzer:
                 
                 html += f"""
                         <tr>
-                            <td class="stock-name">{row['Name']}</td>
+                            <td class="stock-name">{self._stock_link(row)}</td>
                             <td>₹{row['Price']:,.0f}</td>
                             <td class="rating">{row['Rating']}</td>
                             <td><strong>{row['Combined_Score']:.0f}</strong></td>
                             <td class="{rsi_class}">{row['RSI']:.0f}</td>
                             <td>{row['MACD']}</td>
+                            <td>{self._format_risk(row, 'P_Target')}</td>
+                            <td>{self._format_risk(row, 'VaR_95')}</td>
                             <td><span class="quality-badge {quality_class}">{row['Quality']}</span></td>
                         </tr>
 """
@@ -811,6 +3313,116 @@ class Nifty50CompleteAnalyzer:
             </div>
 """
         
+        # Sector Overview
+        if not self.sector_summary.empty:
+            html += """
+            <div class="section">
+                <h2 class="section-title info">🏭 SECTOR OVERVIEW</h2>
+                <table>
+                    <thead class="info">
+                        <tr>
+                            <th>Sector</th>
+                            <th>Stocks</th>
+                            <th>Avg Score</th>
+                            <th>3M Return</th>
+                            <th>RS vs NIFTY</th>
+                            <th>Leader</th>
+                        </tr>
+                    </thead>
+                    <tbody>
+"""
+            for idx, row in self.sector_summary.iterrows():
+                rs_class = "upside-positive" if row['Relative_Strength'] >= 1 else "upside-negative"
+                html += f"""
+                        <tr>
+                            <td class="stock-name">{row['Sector']}</td>
+                            <td>{row['Stocks']}</td>
+                            <td><strong>{row['Avg_Score']:.0f}</strong></td>
+                            <td>{row['Return_3M']:+.1f}%</td>
+                            <td class="{rs_class}">{row['Relative_Strength']:.2f}</td>
+                            <td>{row['Leader']}</td>
+                        </tr>
+"""
+            html += """
+                    </tbody>
+                </table>
+            </div>
+"""
+        
+        # Suggested Portfolio
+        if not self.portfolio.empty:
+            method_label = "Risk Parity" if self.portfolio_method == 'risk_parity' else "Mean-Variance"
+            html += f"""
+            <div class="section">
+                <h2 class="section-title info">💼 SUGGESTED PORTFOLIO ({method_label})</h2>
+                <table>
+                    <thead class="info">
+                        <tr>
+                            <th>Stock</th>
+                            <th>Sector</th>
+                            <th>Weight</th>
+                            <th>Stop Loss</th>
+                            <th>Risk Share</th>
+                        </tr>
+                    </thead>
+                    <tbody>
+"""
+            for idx, row in self.portfolio.iterrows():
+                html += f"""
+                        <tr>
+                            <td class="stock-name">{row['Name']}</td>
+                            <td>{row['Sector']}</td>
+                            <td><strong>{row['Weight']:.1f}%</strong></td>
+                            <td>₹{row['Stop_Loss']:,.0f} ({row['SL_Percentage']:.1f}%)</td>
+                            <td>{row['Risk_Contribution']:.1f}%</td>
+                        </tr>
+"""
+            cash = max(0.0, 100 - self.portfolio['Weight'].sum())
+            html += f"""
+                    </tbody>
+                </table>
+                <p>Cash: {cash:.1f}% | Position weights are capped so a stop-out costs at most {self.portfolio_stop_risk * 100:.0f}% of capital.</p>
+            </div>
+"""
+        
+        # Position Sizing
+        if not top_buys.empty and 'Position_Size' in top_buys.columns:
+            html += f"""
+            <div class="section">
+                <h2 class="section-title info">📐 POSITION SIZING (ATR-BASED)</h2>
+                <table>
+                    <thead class="info">
+                        <tr>
+                            <th>Stock</th>
+                            <th>Price</th>
+                            <th>ATR %</th>
+                            <th>ATR Stop</th>
+                            <th>ATR Target</th>
+                            <th>Qty</th>
+                            <th>Value</th>
+                        </tr>
+                    </thead>
+                    <tbody>
+"""
+            for idx, row in top_buys.iterrows():
+                html += f"""
+                        <tr>
+                            <td class="stock-name">{row['Name']}</td>
+                            <td>₹{row['Price']:,.0f}</td>
+                            <td>{row['ATR_Pct']:.1f}%</td>
+                            <td>₹{row['ATR_Stop']:,.0f}</td>
+                            <td>₹{row['ATR_Target']:,.0f}</td>
+                            <td><strong>{row['Position_Size']:,.0f}</strong></td>
+                            <td>₹{row['Position_Value']:,.0f}</td>
+                        </tr>
+"""
+            html += f"""
+                    </tbody>
+                </table>
+                <p>Sized for ₹{self.capital:,.0f} capital risking {self.risk_per_trade * 100:.1f}% per trade; stops at {self.atr_stop_multiple:g}×ATR, targets at {self.atr_target_multiple:g}×ATR.</p>
+            </div>
+"""
+        
         # Disclaimer
         next_update = "4:30 PM" if now.hour < 12 else "9:30 AM (Next Day)"
         html += f"""
@@ -836,15 +3448,19 @@ class Nifty50CompleteAnalyzer:
 </html>
 """
         
-        # Write to file
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(html)
+        # Write to file (atomically, so a crash never leaves a partial page)
+        self._atomic_write(output_file, html)
         
         print(f"✅ GitHub Pages HTML generated: {output_file}\n")
         return output_file
     
     def generate_email_html(self):
         """Generate beautiful HTML email with BLACK background"""
+        fragments = self.email_fragments()
+        return ''.join(fragments[key] for key in self.EMAIL_SECTIONS)
+    
+    def email_fragments(self):
+        """Shared email sections rendered once per run, keyed by EMAIL_SECTIONS"""
         df = pd.DataFrame(self.results)
         top_buys, top_sells = self.get_top_recommendations()
         
@@ -910,8 +3526,47 @@ class Nifty50CompleteAnalyzer:
                                 </tr>
                             </table>
 """
+        fragments = {'header': html}
+        
+        # Alerts
+        html = ''
+        if self.alerts:
+            html += """
+                            <!-- Alerts Section -->
+                            <h2 style="color: #b45309; border-bottom: 3px solid #f59e0b; padding-bottom: 10px; margin-top: 40px;">🔔 ALERTS</h2>
+                            <ul style="color: #000000; font-size: 14px; line-height: 1.8;">
+"""
+            for alert in self.alerts:
+                html += f"""
+                                <li>{alert['Message']}</li>
+"""
+            html += """
+                            </ul>
+"""
+        
+        fragments['alerts'] = html
+        
+        # Data quality
+        html = ''
+        dq_issues = self.get_data_quality_issues()
+        if dq_issues:
+            html += """
+                            <!-- Data Quality Section -->
+                            <h2 style="color: #b45309; border-bottom: 3px solid #f59e0b; padding-bottom: 10px; margin-top: 40px;">🧪 DATA QUALITY</h2>
+                            <ul style="color: #000000; font-size: 14px; line-height: 1.8;">
+"""
+            for r in dq_issues:
+                html += f"""
+                                <li><strong>{r['Name']}</strong> {r['DQ_Status']}: {r['DQ_Flags']}</li>
+"""
+            html += """
+                            </ul>
+"""
+        
+        fragments['data_quality'] = html
         
         # Top 10 Buy Recommendations
+        html = ''
         if not top_buys.empty:
             html += """
                             <!-- BUY Section -->
@@ -925,6 +3580,8 @@ class Nifty50CompleteAnalyzer:
                                     <th style="color: #ffffff; text-align: left; padding: 16px 12px; font-size: 13px;">UPSIDE %</th>
                                     <th style="color: #ffffff; text-align: left; padding: 16px 12px; font-size: 13px;">TARGET</th>
                                     <th style="color: #ffffff; text-align: left; padding: 16px 12px; font-size: 13px;">STOP LOSS</th>
+                                    <th style="color: #ffffff; text-align: left; padding: 16px 12px; font-size: 13px;">HIT %</th>
+                                    <th style="color: #ffffff; text-align: left; padding: 16px 12px; font-size: 13px;">VAR 95%</th>
                                     <th style="color: #ffffff; text-align: left; padding: 16px 12px; font-size: 13px;">QUALITY</th>
                                 </tr>
 """
@@ -951,21 +3608,32 @@ class Nifty50CompleteAnalyzer:
                 else:
                     badge_color = "#dc2626"
                 
+                # Correlation cluster marker
+                cluster_badge = ''
+                if row['Concentrated']:
+                    cluster_badge = f' <span style="background-color: #fef3c7; color: #92400e; padding: 2px 6px; border-radius: 5px; font-size: 10px;">Cluster {row["Cluster"]}</span>'
+                
                 html += f"""
                                 <tr bgcolor="{row_bg}">
-                                    <td style="color: #000000; font-weight: 600; padding: 14px 12px; border: 1px solid #d1d5db;">{row['Name']}</td>
+                                    <td style="color: #000000; font-weight: 600; padding: 14px 12px; border: 1px solid #d1d5db;">{row['Name']}{cluster_badge}</td>
                                     <td style="color: #000000; padding: 14px 12px; border: 1px solid #d1d5db;">₹{row['Price']:,.0f}</td>
                                     <td style="color: #000000; padding: 14px 12px; border: 1px solid #d1d5db; font-size: 12px; font-weight: bold;">{row['Rating']}</td>
                                     <td style="color: #000000; font-weight: bold; padding: 14px 12px; border: 1px solid #d1d5db;">{row['Combined_Score']:.0f}</td>
                                     <td style="color: {upside_color}; font-weight: bold; padding: 14px 12px; border: 1px solid #d1d5db; font-size: 16px;">{row['Upside']:+.1f}%</td>
                                     <td style="color: #000000; padding: 14px 12px; border: 1px solid #d1d5db;">₹{row['Target_1']:,.0f}</td>
                                     <td style="color: #000000; padding: 14px 12px; border: 1px solid #d1d5db;">₹{row['Stop_Loss']:,.0f}</td>
+                                    <td style="color: #000000; padding: 14px 12px; border: 1px solid #d1d5db;">{self._format_risk(row, 'P_Target')}</td>
+                                    <td style="color: #000000; padding: 14px 12px; border: 1px solid #d1d5db;">{self._format_risk(row, 'VaR_95')}</td>
                                     <td style="padding: 14px 12px; border: 1px solid #d1d5db;"><span style="background-color: {badge_color}; color: #ffffff; padding: 5px 10px; border-radius: 5px; font-size: 11px; font-weight: bold;">{row['Quality']}</span></td>
                                 </tr>
 """
             html += """
                             </table>
 """
+            if top_buys['Concentrated'].any():
+                html += f"""
+                            <p style="color: #92400e; font-size: 13px;">⚠️ {int(top_buys['Concentrated'].sum())} picks move together (same correlation cluster) - consider diversifying.</p>
+"""
         
         # Top 10 Sell Recommendations
         if not top_sells.empty:
@@ -980,6 +3648,8 @@ class Nifty50CompleteAnalyzer:
                                     <th style="color: #ffffff; text-align: left; padding: 16px 12px; font-size: 13px;">SCORE</th>
                                     <th style="color: #ffffff; text-align: left; padding: 16px 12px; font-size: 13px;">RSI</th>
                                     <th style="color: #ffffff; text-align: left; padding: 16px 12px; font-size: 13px;">MACD</th>
+                                    <th style="color: #ffffff; text-align: left; padding: 16px 12px; font-size: 13px;">HIT %</th>
+                                    <th style="color: #ffffff; text-align: left; padding: 16px 12px; font-size: 13px;">VAR 95%</th>
                                     <th style="color: #ffffff; text-align: left; padding: 16px 12px; font-size: 13px;">QUALITY</th>
                                 </tr>
 """
@@ -1014,6 +3684,8 @@ class Nifty50CompleteAnalyzer:
                                     <td style="color: #000000; font-weight: bold; padding: 14px 12px; border: 1px solid #d1d5db;">{row['Combined_Score']:.0f}</td>
                                     <td style="color: {rsi_color}; font-weight: bold; padding: 14px 12px; border: 1px solid #d1d5db; font-size: 16px;">{row['RSI']:.0f}</td>
                                     <td style="color: #000000; padding: 14px 12px; border: 1px solid #d1d5db;">{row['MACD']}</td>
+                                    <td style="color: #000000; padding: 14px 12px; border: 1px solid #d1d5db;">{self._format_risk(row, 'P_Target')}</td>
+                                    <td style="color: #000000; padding: 14px 12px; border: 1px solid #d1d5db;">{self._format_risk(row, 'VaR_95')}</td>
                                     <td style="padding: 14px 12px; border: 1px solid #d1d5db;"><span style="background-color: {badge_color}; color: #ffffff; padding: 5px 10px; border-radius: 5px; font-size: 11px; font-weight: bold;">{row['Quality']}</span></td>
                                 </tr>
 """
@@ -1021,9 +3693,118 @@ class Nifty50CompleteAnalyzer:
                             </table>
 """
         
+        fragments['top_lists'] = html
+        
+        # Sector Overview
+        html = ''
+        if not self.sector_summary.empty:
+            html += """
+                            <!-- Sector Section -->
+                            <h2 style="color: #1e40af; border-bottom: 3px solid #1e40af; padding-bottom: 10px; margin-top: 40px;">🏭 SECTOR OVERVIEW</h2>
+                            <table width="100%" cellpadding="12" cellspacing="0" border="1" bordercolor="#d1d5db" style="border-collapse: collapse; margin: 20px 0;">
+                                <tr bgcolor="#1e40af">
+                                    <th style="color: #ffffff; text-align: left; padding: 16px 12px; font-size: 13px;">SECTOR</th>
+                                    <th style="color: #ffffff; text-align: left; padding: 16px 12px; font-size: 13px;">STOCKS</th>
+                                    <th style="color: #ffffff; text-align: left; padding: 16px 12px; font-size: 13px;">AVG SCORE</th>
+                                    <th style="color: #ffffff; text-align: left; padding: 16px 12px; font-size: 13px;">3M RETURN</th>
+                                    <th style="color: #ffffff; text-align: left; padding: 16px 12px; font-size: 13px;">RS VS NIFTY</th>
+                                    <th style="color: #ffffff; text-align: left; padding: 16px 12px; font-size: 13px;">LEADER</th>
+                                </tr>
+"""
+            row_num = 0
+            for idx, row in self.sector_summary.iterrows():
+                row_num += 1
+                row_bg = "#ffffff" if row_num % 2 == 1 else "#f9fafb"
+                rs_color = "#15803d" if row['Relative_Strength'] >= 1 else "#dc2626"
+                html += f"""
+                                <tr bgcolor="{row_bg}">
+                                    <td style="color: #000000; font-weight: 600; padding: 14px 12px; border: 1px solid #d1d5db;">{row['Sector']}</td>
+                                    <td style="color: #000000; padding: 14px 12px; border: 1px solid #d1d5db;">{row['Stocks']}</td>
+                                    <td style="color: #000000; font-weight: bold; padding: 14px 12px; border: 1px solid #d1d5db;">{row['Avg_Score']:.0f}</td>
+                                    <td style="color: #000000; padding: 14px 12px; border: 1px solid #d1d5db;">{row['Return_3M']:+.1f}%</td>
+                                    <td style="color: {rs_color}; font-weight: bold; padding: 14px 12px; border: 1px solid #d1d5db;">{row['Relative_Strength']:.2f}</td>
+                                    <td style="color: #000000; padding: 14px 12px; border: 1px solid #d1d5db;">{row['Leader']}</td>
+                                </tr>
+"""
+            html += """
+                            </table>
+"""
+        
+        # Suggested Portfolio
+        if not self.portfolio.empty:
+            method_label = "Risk Parity" if self.portfolio_method == 'risk_parity' else "Mean-Variance"
+            html += f"""
+                            <!-- Portfolio Section -->
+                            <h2 style="color: #1e40af; border-bottom: 3px solid #1e40af; padding-bottom: 10px; margin-top: 40px;">💼 SUGGESTED PORTFOLIO ({method_label})</h2>
+                            <table width="100%" cellpadding="12" cellspacing="0" border="1" bordercolor="#d1d5db" style="border-collapse: collapse; margin: 20px 0;">
+                                <tr bgcolor="#1e40af">
+                                    <th style="color: #ffffff; text-align: left; padding: 16px 12px; font-size: 13px;">STOCK</th>
+                                    <th style="color: #ffffff; text-align: left; padding: 16px 12px; font-size: 13px;">SECTOR</th>
+                                    <th style="color: #ffffff; text-align: left; padding: 16px 12px; font-size: 13px;">WEIGHT</th>
+                                    <th style="color: #ffffff; text-align: left; padding: 16px 12px; font-size: 13px;">STOP LOSS</th>
+                                    <th style="color: #ffffff; text-align: left; padding: 16px 12px; font-size: 13px;">RISK SHARE</th>
+                                </tr>
+"""
+            row_num = 0
+            for idx, row in self.portfolio.iterrows():
+                row_num += 1
+                row_bg = "#ffffff" if row_num % 2 == 1 else "#f9fafb"
+                html += f"""
+                                <tr bgcolor="{row_bg}">
+                                    <td style="color: #000000; font-weight: 600; padding: 14px 12px; border: 1px solid #d1d5db;">{row['Name']}</td>
+                                    <td style="color: #000000; padding: 14px 12px; border: 1px solid #d1d5db;">{row['Sector']}</td>
+                                    <td style="color: #000000; font-weight: bold; padding: 14px 12px; border: 1px solid #d1d5db;">{row['Weight']:.1f}%</td>
+                                    <td style="color: #000000; padding: 14px 12px; border: 1px solid #d1d5db;">₹{row['Stop_Loss']:,.0f} ({row['SL_Percentage']:.1f}%)</td>
+                                    <td style="color: #000000; padding: 14px 12px; border: 1px solid #d1d5db;">{row['Risk_Contribution']:.1f}%</td>
+                                </tr>
+"""
+            cash = max(0.0, 100 - self.portfolio['Weight'].sum())
+            html += f"""
+                            </table>
+                            <p style="color: #000000; font-size: 13px;">Cash: {cash:.1f}% | Position weights are capped so a stop-out costs at most {self.portfolio_stop_risk * 100:.0f}% of capital.</p>
+"""
+        
+        # Position Sizing
+        if not top_buys.empty and 'Position_Size' in top_buys.columns:
+            html += """
+                            <!-- Position Sizing Section -->
+                            <h2 style="color: #1e40af; border-bottom: 3px solid #1e40af; padding-bottom: 10px; margin-top: 40px;">📐 POSITION SIZING (ATR-BASED)</h2>
+                            <table width="100%" cellpadding="12" cellspacing="0" border="1" bordercolor="#d1d5db" style="border-collapse: collapse; margin: 20px 0;">
+                                <tr bgcolor="#1e40af">
+                                    <th style="color: #ffffff; text-align: left; padding: 16px 12px; font-size: 13px;">STOCK</th>
+                                    <th style="color: #ffffff; text-align: left; padding: 16px 12px; font-size: 13px;">PRICE</th>
+                                    <th style="color: #ffffff; text-align: left; padding: 16px 12px; font-size: 13px;">ATR %</th>
+                                    <th style="color: #ffffff; text-align: left; padding: 16px 12px; font-size: 13px;">ATR STOP</th>
+                                    <th style="color: #ffffff; text-align: left; padding: 16px 12px; font-size: 13px;">ATR TARGET</th>
+                                    <th style="color: #ffffff; text-align: left; padding: 16px 12px; font-size: 13px;">QTY</th>
+                                    <th style="color: #ffffff; text-align: left; padding: 16px 12px; font-size: 13px;">VALUE</th>
+                                </tr>
+"""
+            row_num = 0
+            for idx, row in top_buys.iterrows():
+                row_num += 1
+                row_bg = "#ffffff" if row_num % 2 == 1 else "#f9fafb"
+                html += f"""
+                                <tr bgcolor="{row_bg}">
+                                    <td style="color: #000000; font-weight: 600; padding: 14px 12px; border: 1px solid #d1d5db;">{row['Name']}</td>
+                                    <td style="color: #000000; padding: 14px 12px; border: 1px solid #d1d5db;">₹{row['Price']:,.0f}</td>
+                                    <td style="color: #000000; padding: 14px 12px; border: 1px solid #d1d5db;">{row['ATR_Pct']:.1f}%</td>
+                                    <td style="color: #000000; padding: 14px 12px; border: 1px solid #d1d5db;">₹{row['ATR_Stop']:,.0f}</td>
+                                    <td style="color: #000000; padding: 14px 12px; border: 1px solid #d1d5db;">₹{row['ATR_Target']:,.0f}</td>
+                                    <td style="color: #000000; font-weight: bold; padding: 14px 12px; border: 1px solid #d1d5db;">{row['Position_Size']:,.0f}</td>
+                                    <td style="color: #000000; padding: 14px 12px; border: 1px solid #d1d5db;">₹{row['Position_Value']:,.0f}</td>
+                                </tr>
+"""
+            html += f"""
+                            </table>
+                            <p style="color: #000000; font-size: 13px;">Sized for ₹{self.capital:,.0f} capital risking {self.risk_per_trade * 100:.1f}% per trade; stops at {self.atr_stop_multiple:g}×ATR, targets at {self.atr_target_multiple:g}×ATR.</p>
+"""
+        
+        fragments['market'] = html
+        
         # Disclaimer and Footer
         next_update = "4:30 PM" if now.hour < 12 else "9:30 AM (Next Day)"
-        html += f"""
+        html = f"""
                             <!-- Disclaimer -->
                             <table width="100%" cellpadding="20" cellspacing="0" border="2" bordercolor="#f59e0b" bgcolor="#fef3c7" style="margin: 30px 0;">
                                 <tr>
@@ -1056,40 +3837,233 @@ class Nifty50CompleteAnalyzer:
 </body>
 </html>
 """
+        fragments['footer'] = html
+        
+        return fragments
+    
+    def _watchlist_row_fragments(self, symbols):
+        """One cached email table row per watched symbol"""
+        rows = {}
+        for result in self.results:
+            if result['Symbol'] not in symbols:
+                continue
+            upside_color = "#15803d" if result['Upside'] > 0 else "#dc2626" if result['Upside'] < 0 else "#000000"
+            rows[result['Symbol']] = f"""
+                                <tr bgcolor="{{row_bg}}">
+                                    <td style="color: #000000; font-weight: 600; padding: 14px 12px; border: 1px solid #d1d5db;">{result['Name']}</td>
+                                    <td style="color: #000000; padding: 14px 12px; border: 1px solid #d1d5db;">₹{result['Price']:,.0f}</td>
+                                    <td style="color: #000000; padding: 14px 12px; border: 1px solid #d1d5db; font-size: 12px; font-weight: bold;">{result['Rating']}</td>
+                                    <td style="color: #000000; font-weight: bold; padding: 14px 12px; border: 1px solid #d1d5db;">{result['Combined_Score']:.0f}</td>
+                                    <td style="color: {upside_color}; font-weight: bold; padding: 14px 12px; border: 1px solid #d1d5db;">{result['Upside']:+.1f}%</td>
+                                    <td style="color: #000000; padding: 14px 12px; border: 1px solid #d1d5db;">₹{result['Stop_Loss']:,.0f}</td>
+                                    <td style="color: #000000; padding: 14px 12px; border: 1px solid #d1d5db;">{result['RSI']:.0f}</td>
+                                </tr>
+"""
+        return rows
+    
+    def render_subscriber_email(self, subscriber, fragments, rows):
+        """Personalized email: the subscriber's watchlist and alerts around the shared sections"""
+        watchlist = [symbol for symbol in subscriber['watchlist'] if symbol in rows]
+        name = subscriber.get('name')
+        title = f"{html_lib.escape(name)}'s WATCHLIST" if name else "YOUR WATCHLIST"
+        
+        html = fragments['header']
+        if watchlist:
+            html += f"""
+                            <!-- Watchlist Section -->
+                            <h2 style="color: #1e40af; border-bottom: 3px solid #1e40af; padding-bottom: 10px; margin-top: 40px;">⭐ {title}</h2>
+                            <table width="100%" cellpadding="12" cellspacing="0" border="1" bordercolor="#d1d5db" style="border-collapse: collapse; margin: 20px 0;">
+                                <tr bgcolor="#1e40af">
+                                    <th style="color: #ffffff; text-align: left; padding: 16px 12px; font-size: 13px;">STOCK</th>
+                                    <th style="color: #ffffff; text-align: left; padding: 16px 12px; font-size: 13px;">PRICE</th>
+                                    <th style="color: #ffffff; text-align: left; padding: 16px 12px; font-size: 13px;">RATING</th>
+                                    <th style="color: #ffffff; text-align: left; padding: 16px 12px; font-size: 13px;">SCORE</th>
+                                    <th style="color: #ffffff; text-align: left; padding: 16px 12px; font-size: 13px;">UPSIDE %</th>
+                                    <th style="color: #ffffff; text-align: left; padding: 16px 12px; font-size: 13px;">STOP LOSS</th>
+                                    <th style="color: #ffffff; text-align: left; padding: 16px 12px; font-size: 13px;">RSI</th>
+                                </tr>
+"""
+            for row_num, symbol in enumerate(watchlist, 1):
+                html += rows[symbol].replace('{row_bg}', "#ffffff" if row_num % 2 == 1 else "#f9fafb", 1)
+            html += """
+                            </table>
+"""
+        
+        # Only the alerts for this subscriber's symbols
+        alerts = [alert for alert in self.alerts if alert['Symbol'] in subscriber['watchlist']]
+        if alerts:
+            html += """
+                            <!-- Alerts Section -->
+                            <h2 style="color: #b45309; border-bottom: 3px solid #f59e0b; padding-bottom: 10px; margin-top: 40px;">🔔 YOUR ALERTS</h2>
+                            <ul style="color: #000000; font-size: 14px; line-height: 1.8;">
+"""
+            for alert in alerts:
+                html += f"""
+                                <li>{alert['Message']}</li>
+"""
+            html += """
+                            </ul>
+"""
+        
+        return html + fragments['top_lists'] + fragments['market'] + fragments['footer'], len(alerts)
+    
+    def load_subscribers(self):
+        """Subscribers as [{"email", "name", "watchlist": [symbols]}]
+        
+        Read from the NIFTY_SUBSCRIBERS environment variable (JSON, e.g. a CI
+        secret) or else from subscribers.json, so addresses never need to live
+        in the published tree.
+        """
+        try:
+            raw = os.environ.get('NIFTY_SUBSCRIBERS')
+            if raw:
+                entries = json.loads(raw)
+            else:
+                with open(self.subscribers_file, 'r', encoding='utf-8') as f:
+                    entries = json.load(f)
+        except OSError:
+            return []
+        except ValueError as e:
+            print(f"⚠️  Could not parse subscribers: {e}")
+            return []
         
-        return html
+        subscribers = []
+        for entry in entries:
+            if not isinstance(entry, dict) or not entry.get('email'):
+                continue
+            watchlist = [str(symbol).upper().replace('.NS', '') for symbol in entry.get('watchlist', [])]
+            subscribers.append({'email': entry['email'], 'name': entry.get('name'), 'watchlist': watchlist})
+        return subscribers
+    
+    def send_subscriber_emails(self, subscribers=None, workers=8):
+        """Render and send personalized watchlist emails from the shared computation"""
+        subscribers = self.load_subscribers() if subscribers is None else subscribers
+        if not subscribers or not self.results:
+            return 0
+        
+        # Shared sections and per-symbol rows are rendered once for everyone
+        started = time.perf_counter()
+        fragments = self.email_fragments()
+        rows = self._watchlist_row_fragments({symbol for sub in subscribers for symbol in sub['watchlist']})
+        subject = self._email_subject()
+        from_email, password = self._gmail_credentials()
+        if not from_email:
+            return 0
+        
+        login_failed = threading.Event()
+        
+        def deliver_batch(batch):
+            # One SMTP connection and login per worker, reused for its whole batch.
+            # Addresses are never logged in full: CI logs may be public.
+            sent, server = 0, None
+            for subscriber in batch:
+                if login_failed.is_set():
+                    break
+                html, alert_count = self.render_subscriber_email(subscriber, fragments, rows)
+                prefix = f"🔔 {alert_count} alerts | " if alert_count else ''
+                msg = self._email_message(from_email, subscriber['email'], prefix + subject, html)
+                
+                # A failed connect or login stops every worker: retrying per subscriber
+                # with bad credentials would get the account throttled or locked
+                if server is None:
+                    try:
+                        server = self._smtp_connect(from_email, password)
+                    except Exception as e:
+                        if not login_failed.is_set():
+                            login_failed.set()
+                            print(f"❌ SMTP connect/login failed ({type(e).__name__}) - stopping subscriber emails")
+                        break
+                try:
+                    server.send_message(msg)
+                    sent += 1
+                except Exception as e:
+                    print(f"❌ Error sending email to {self._mask_email(subscriber['email'])}: {type(e).__name__}")
+                    server = self._smtp_close(server)
+            self._smtp_close(server)
+            return sent
+        
+        batches = [subscribers[i::workers] for i in range(min(workers, len(subscribers)))]
+        with ThreadPoolExecutor(max_workers=len(batches)) as pool:
+            sent = sum(pool.map(deliver_batch, batches))
+        
+        if sent:
+            self.commit_alert_state()
+        print(f"📬 Subscribers: {sent}/{len(subscribers)} personalized emails over {len(batches)} "
+              f"connections in {time.perf_counter() - started:.1f}s\n")
+        return sent
+    
+    @staticmethod
+    def _mask_email(address):
+        """j***@example.com - enough to tell subscribers apart in logs"""
+        user, _, domain = address.partition('@')
+        return f"{user[:1]}***@{domain}"
+    
+    def _gmail_credentials(self):
+        """GMAIL_USER and GMAIL_APP_PASSWORD, or (None, None) with a warning"""
+        from_email = os.environ.get('GMAIL_USER')
+        password = os.environ.get('GMAIL_APP_PASSWORD')
+        if not from_email or not password:
+            print("❌ Gmail credentials not found in environment variables")
+            print("   Set GMAIL_USER and GMAIL_APP_PASSWORD")
+            return None, None
+        return from_email, password
+    
+    def _smtp_connect(self, from_email, password):
+        """Open and log in to a Gmail SMTP connection"""
+        server = smtplib.SMTP('smtp.gmail.com', 587)
+        server.starttls()
+        server.login(from_email, password)
+        return server
+    
+    def _smtp_close(self, server):
+        """Quit an SMTP connection, ignoring one that already dropped"""
+        if server is not None:
+            try:
+                server.quit()
+            except Exception:
+                pass
+        return None
+    
+    def _email_message(self, from_email, to_email, subject, html_body):
+        """Build an HTML email message"""
+        msg = MIMEMultipart('alternative')
+        msg['From'] = from_email
+        msg['To'] = to_email
+        msg['Subject'] = subject
+        msg.attach(MIMEText(html_body, 'html'))
+        return msg
+    
+    def _email_subject(self):
+        """Subject line shared by the report and subscriber emails"""
+        now = self.get_ist_time()
+        time_of_day = "Morning" if now.hour < 12 else "Evening"
+        return f"📊 NIFTY 50 Analysis - {time_of_day} Report ({now.strftime('%d %b %Y')})"
     
     def send_email(self, to_email):
         """Send email with analysis report"""
+        subject = self._email_subject()
+        if self.alerts:
+            subject = f"🔔 {len(self.alerts)} alerts | " + subject
+        
+        sent = self._deliver_email(to_email, subject, self.generate_email_html())
+        if sent:
+            self.commit_alert_state()
+        return sent
+    
+    def _deliver_email(self, to_email, subject, html_body):
+        """Deliver an HTML email through Gmail SMTP"""
         try:
             # Get credentials from environment variables
-            from_email = os.environ.get('GMAIL_USER')
-            password = os.environ.get('GMAIL_APP_PASSWORD')
-            
-            if not from_email or not password:
-                print("❌ Gmail credentials not found in environment variables")
-                print("   Set GMAIL_USER and GMAIL_APP_PASSWORD")
+            from_email, password = self._gmail_credentials()
+            if not from_email:
                 return False
             
-            # Get IST time
-            now = self.get_ist_time()
-            time_of_day = "Morning" if now.hour < 12 else "Evening"
-            
             # Create message
-            msg = MIMEMultipart('alternative')
-            msg['From'] = from_email
-            msg['To'] = to_email
-            msg['Subject'] = f"📊 NIFTY 50 Analysis - {time_of_day} Report ({now.strftime('%d %b %Y')})"
-            
-            # Generate email body
-            html_body = self.generate_email_html()
-            msg.attach(MIMEText(html_body, 'html'))
+            msg = self._email_message(from_email, to_email, subject, html_body)
             
             # Send email
-            print(f"📧 Sending email to {to_email}...")
-            server = smtplib.SMTP('smtp.gmail.com', 587)
-            server.starttls()
-            server.login(from_email, password)
+            print(f"📧 Sending email to {self._mask_email(to_email)}...")
+            server = self._smtp_connect(from_email, password)
             server.send_message(msg)
             server.quit()
             
@@ -1103,6 +4077,7 @@ class Nifty50CompleteAnalyzer:
     def generate_complete_report(self, send_email_flag=True, recipient_email=None, generate_github_pages=True):
         """Generate complete analysis report"""
         ist_time = self.get_ist_time()
+        self.reset_run_state()
         
         print("=" * 70)
         print("📊 NIFTY 50 STOCK ANALYZER")
@@ -1113,22 +4088,456 @@ class Nifty50CompleteAnalyzer:
         # Analyze all stocks
         self.analyze_all_stocks()
         
+        # Sector aggregates and relative strength
+        self.analyze_sectors()
+        
+        # Correlation clusters across the universe
+        self.analyze_correlations()
+        
+        # Portfolio weights for the buy set
+        self.build_portfolio()
+        
+        # ATR stops, targets and position sizes
+        self.calculate_position_sizing()
+        
+        # Target-vs-stop probabilities and VaR
+        self.simulate_risk()
+        
+        # Threshold / crossover alerts vs the previous run
+        self.evaluate_alerts()
+        
         # Generate GitHub Pages HTML
         if generate_github_pages:
-            self.generate_github_pages_html('index.html')
+            if self.web_mode == 'compact':
+                self.generate_compact_site('.')
+            else:
+                self.generate_github_pages_html('index.html')
+            self.generate_stock_pages(self.stock_pages_dir)
         
         # Send email if requested
         if send_email_flag and recipient_email:
             self.send_email(recipient_email)
         
+        # Personalized watchlist emails reuse the same results
+        if send_email_flag:
+            self.send_subscriber_emails()
+        
+        # Keep this run's results for next run's crossover alerts
+        self.save_results_snapshot()
+        
+        # Scoring inputs for what-if rescoring
+        self.save_feature_matrix()
+        
+        # Pack the caches so the next (possibly fresh) runner starts warm
+        self.save_cache_bundle()
+        self.complete_run_journal()
+        
         print("=" * 70)
         print("✅ ANALYSIS COMPLETE!")
         print("=" * 70)
+    
+    # ========== WHAT-IF RESCORING ==========
+    
+    def save_feature_matrix(self, path=None):
+        """Store this run's scoring inputs and production ranking as a compact .npz"""
+        path = path or self.features_path
+        results = [r for r in self.results if r['Symbol'] in self.feature_rows]
+        if not results:
+            return None
+        
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer,
+            columns=np.array(self.FEATURE_COLUMNS),
+            symbols=np.array([r['Symbol'] for r in results]),
+            names=np.array([r['Name'] for r in results]),
+            matrix=np.array([self.feature_rows[r['Symbol']] for r in results], dtype=np.float64),
+            prod_score=np.array([r['Combined_Score'] for r in results], dtype=np.float64),
+            prod_recommendation=np.array([r['Recommendation'] for r in results]),
+            run_id=np.array(self.run_id),
+        )
+        self._atomic_write(path, buffer.getvalue())
+        return path
+    
+    def load_feature_matrix(self, path=None):
+        """Load a stored feature matrix as a dict of arrays"""
+        with np.load(path or self.features_path) as data:
+            return {key: data[key] for key in data.files}
+    
+    @classmethod
+    def validate_cutoffs(cls, cutoffs):
+        """Rating cutoffs as floats: one per band boundary, highest first"""
+        try:
+            cutoffs = tuple(float(c) for c in cutoffs)
+        except (TypeError, ValueError):
+            raise ValueError("cutoffs must be numbers")
+        expected = len(cls.RATINGS) - 1
+        if len(cutoffs) != expected:
+            names = ','.join(rec for _, rec in cls.RATINGS[:-1])
+            raise ValueError(f"expected {expected} cutoffs ({names}), got {len(cutoffs)}")
+        if any(higher < lower for higher, lower in zip(cutoffs, cutoffs[1:])):
+            raise ValueError("cutoffs must be in descending order")
+        return cutoffs
+    
+    def rescore(self, features=None, tech_weight=0.5, cutoffs=(75, 55, 45, 30),
+                use_mtf=None, use_extended=None, use_index_relative=None):
+        """Recompute scores, ratings, stops and targets for the whole universe at once
+        
+        Mirrors the scoring in analyze_stock as array expressions over the feature
+        matrix; with the defaults it reproduces the production results exactly.
+        """
+        cutoffs = self.validate_cutoffs(cutoffs)
+        features = self.load_feature_matrix() if features is None else features
+        use_mtf = self.use_mtf_score if use_mtf is None else use_mtf
+        use_extended = self.use_extended_score if use_extended is None else use_extended
+        use_index_relative = self.use_index_relative_score if use_index_relative is None else use_index_relative
+        f = dict(zip(features['columns'].tolist(), features['matrix'].T))
+        price, support, resistance, target = f['Price'], f['Support'], f['Resistance'], f['Target_Price']
+        
+        # Technical score and its range, component by component
+        tech = f['Tech_Core'].copy()
+        tech_range = np.full(len(price), 6.0)
+        if use_mtf:
+            tech += f['MTF_Points']
+            tech_range += 1
+        if use_extended:
+            tech += f['Ext_Points']
+            tech_range += 3
+        if use_index_relative:
+            tech += f['Relative_Points'] * f['Has_Relative']
+            tech_range += f['Has_Relative']
+        
+        tech_normalized = ((tech + tech_range) / (2 * tech_range)) * 100
+        combined = (tech_normalized * tech_weight) + (f['Fund_Score'] * (1 - tech_weight))
+        
+        # Rating bands, with quarantined symbols held at HOLD
+        level = np.select([combined >= cutoff for cutoff in cutoffs], np.arange(len(cutoffs)), len(cutoffs))
+        rating = np.array([label for label, _ in self.RATINGS])[level]
+        recommendation = np.array([rec for _, rec in self.RATINGS])[level]
+        quarantined = f['Quarantined'] > 0
+        rating = np.where(quarantined, "⚠️ DATA QUARANTINED", rating)
+        recommendation = np.where(quarantined, "HOLD", recommendation)
+        
+        # Stops and targets
+        is_buy = np.isin(recommendation, ['STRONG BUY', 'BUY'])
+        stop_loss = np.where(is_buy, support * 0.97, resistance * 1.03)
+        sl_percentage = np.where(is_buy, ((price - stop_loss) / price) * 100, ((stop_loss - price) / price) * 100)
+        target_1 = np.where(is_buy, resistance, support)
+        target_2 = np.where(is_buy, np.where(target > price, np.minimum(target, resistance * 1.05), resistance * 1.05),
+                            support * 0.95)
+        upside = np.where(is_buy, ((target_1 - price) / price) * 100, ((price - target_1) / price) * 100)
+        risk = np.abs(price - stop_loss)
+        reward = np.abs(target_1 - price)
+        risk_reward = np.where(risk > 0, reward / np.where(risk > 0, risk, 1), 0)
+        
+        # NumPy's rounding, as analyze_stock uses for these fields
+        def rounded(values, digits=2):
+            return np.round(values, digits).tolist()
+        
+        return pd.DataFrame({
+            'Symbol': features['symbols'].tolist(),
+            'Name': features['names'].tolist(),
+            'Tech_Score_Norm': rounded(tech_normalized, 1),
+            'Combined_Score': rounded(combined, 1),
+            'Rating': rating.tolist(),
+            'Recommendation': recommendation.tolist(),
+            'Stop_Loss': rounded(stop_loss),
+            'SL_Percentage': rounded(sl_percentage),
+            'Target_1': rounded(target_1),
+            'Target_2': rounded(target_2),
+            'Upside': rounded(upside),
+            'Risk_Reward': rounded(risk_reward),
+        })
+    
+    def rescore_diff(self, rescored, features=None):
+        """Side-by-side production vs rescored ranking, in new rank order"""
+        features = self.load_feature_matrix() if features is None else features
+        diff = pd.DataFrame({
+            'Symbol': features['symbols'].tolist(),
+            'Name': features['names'].tolist(),
+            'Score_Prod': features['prod_score'],
+            'Rec_Prod': features['prod_recommendation'].tolist(),
+        }).merge(rescored[['Symbol', 'Combined_Score', 'Recommendation']].rename(
+            columns={'Combined_Score': 'Score_New', 'Recommendation': 'Rec_New'}), on='Symbol')
+        
+        diff['Rank_Prod'] = diff['Score_Prod'].rank(ascending=False, method='first').astype(int)
+        diff['Rank_New'] = diff['Score_New'].rank(ascending=False, method='first').astype(int)
+        diff['Moved'] = diff['Rank_Prod'] - diff['Rank_New']
+        diff['Changed'] = diff['Rec_Prod'] != diff['Rec_New']
+        return diff.sort_values('Rank_New').reset_index(drop=True)
+    
+    def run_rescore(self, path=None, show_all=False, **weights):
+        """CLI entry: rescore the last run and print the diff against production"""
+        try:
+            features = self.load_feature_matrix(path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"❌ No feature matrix to rescore ({e}) - run a full analysis first")
+            return None
+        
+        started = time.perf_counter()
+        rescored = self.rescore(features, **weights)
+        diff = self.rescore_diff(rescored, features)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        
+        changed = diff[diff['Changed'] | (diff['Moved'] != 0)]
+        print(f"🧮 Rescored {len(diff)} stocks from run {features['run_id']} in {elapsed_ms:.1f} ms "
+              f"({weights or 'production weights'})")
+        print(f"   {int(diff['Changed'].sum())} recommendation changes, {int((diff['Moved'] != 0).sum())} rank moves\n")
+        if not changed.empty or show_all:
+            print((diff if show_all else changed).to_string(index=False))
+        return diff
+    
+    # ========== REDUCED PRECISION ==========
+    
+    def verify_reduced_precision(self, symbols=None):
+        """Score the universe from float64 and from float32 storage and compare rounded outputs
+        
+        Needs float64 price data (the default mode). Every numeric result field
+        must agree to within one unit of its 2-decimal rounding and every label
+        (recommendation, rating, signals) must match exactly.
+        """
+        symbols = [s for s in (symbols or list(self.price_data)) if s in self.fundamentals]
+        if not symbols:
+            print("⚠️  No price data to verify - run the analysis first")
+            return None
+        
+        paths = {}
+        for dtype in ('float64', 'float32'):
+            shadow = copy.copy(self)
+            shadow.price_dtype = np.dtype(dtype)
+            shadow.timeframe_bars = {}
+            shadow.feature_rows = {}
+            shadow.price_data = {s: shadow._to_storage(self.price_data[s]) for s in symbols}
+            
+            started = time.perf_counter()
+            results = {}
+            for s in symbols:
+                result = shadow.analyze_stock(s, self.nifty50_stocks.get(s, s), shadow.price_data[s], self.fundamentals[s])
+                if result:
+                    results[result['Symbol']] = result
+            latest = {key: value.iloc[-1] for key, value in shadow.calculate_panel_indicators().items()}
+            paths[dtype] = {
+                'results': results,
+                'panel': latest,
+                'seconds': time.perf_counter() - started,
+                'bytes': sum(int(df.memory_usage(index=False).sum()) for df in shadow.price_data.values()),
+            }
+        
+        full, reduced = paths['float64'], paths['float32']
+        numeric_diffs, label_mismatches, exact, compared = {}, [], 0, 0
+        for symbol, result in full['results'].items():
+            other = reduced['results'].get(symbol)
+            if other is None:
+                label_mismatches.append((symbol, 'result', 'present', 'missing'))
+                continue
+            for key, value in result.items():
+                if isinstance(value, (bool, np.bool_)) or not isinstance(value, (int, float, np.number)):
+                    if value != other.get(key):
+                        label_mismatches.append((symbol, key, value, other.get(key)))
+                    continue
+                compared += 1
+                diff = abs(float(value) - float(other.get(key) or 0))
+                exact += diff == 0
+                numeric_diffs[key] = max(numeric_diffs.get(key, 0.0), diff)
+        
+        # Panel-wide indicator arrays (OBV runs to 1e9+, so compare relative error)
+        panel_diff = max(float(np.nanmax(np.abs(reduced['panel'][key].astype(np.float64) - full['panel'][key])
+                                         / np.maximum(np.abs(full['panel'][key]), 1.0)))
+                         for key in full['panel']) if full['panel'] else 0.0
+        
+        tolerance = 0.01 + 1e-9
+        worst = sorted(numeric_diffs.items(), key=lambda item: -item[1])[:5]
+        report = {
+            'symbols': len(full['results']),
+            'values_compared': compared,
+            'exact_matches': int(exact),
+            'max_abs_diff': dict(worst),
+            'panel_indicator_max_rel_diff': panel_diff,
+            'label_mismatches': label_mismatches,
+            'bytes_float64': full['bytes'],
+            'bytes_float32': reduced['bytes'],
+            'seconds_float64': round(full['seconds'], 2),
+            'seconds_float32': round(reduced['seconds'], 2),
+            'passed': not label_mismatches and all(diff <= tolerance for diff in numeric_diffs.values()),
+        }
+        
+        print(f"🔬 Reduced-precision check: {report['symbols']} stocks, "
+              f"{report['exact_matches']}/{compared} rounded values identical, "
+              f"{len(label_mismatches)} label mismatches")
+        print(f"   Largest differences: {', '.join(f'{k} {v:.4f}' for k, v in worst) or 'none'}; "
+              f"panel indicators {panel_diff:.1e} relative")
+        print(f"   Price store: {report['bytes_float64'] / 1024:.0f} KB float64 -> {report['bytes_float32'] / 1024:.0f} KB float32")
+        print(f"   {'✅ PASSED' if report['passed'] else '❌ FAILED'}: rounded outputs "
+              f"{'match' if report['passed'] else 'differ'} within one rounding unit\n")
+        return report
+    
+    # ========== DAEMON MODE ==========
+    
+    def load_holiday_calendar(self):
+        """NSE holidays from a local file: one YYYY-MM-DD per line, '#' starts a comment"""
+        holidays = set()
+        try:
+            with open(self.holidays_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.split('#', 1)[0].strip()
+                    if line:
+                        holidays.add(datetime.strptime(line.split()[0], '%Y-%m-%d').date())
+        except OSError:
+            print(f"⚠️  Holiday calendar {self.holidays_file} not found - only weekends are skipped")
+        return holidays
+    
+    def is_trading_day(self, day, holidays):
+        """Weekday and not an NSE holiday"""
+        return day.weekday() < 5 and day not in holidays
+    
+    def next_scheduled_run(self, now, holidays):
+        """Next scheduled run time (IST) that falls on a trading day"""
+        for offset in range(0, 30):
+            day = (now + timedelta(days=offset)).date()
+            if not self.is_trading_day(day, holidays):
+                continue
+            for slot in sorted(self.schedule_times):
+                hour, minute = map(int, slot.split(':'))
+                run_at = now.tzinfo.localize(datetime(day.year, day.month, day.day, hour, minute))
+                if run_at > now:
+                    return run_at
+        return None
+    
+    def start_health_server(self, port):
+        """Serve daemon status as JSON on /health and /status"""
+        analyzer = self
+        
+        class HealthHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/health', '/status'):
+                    self.send_error(404)
+                    return
+                body = json.dumps(analyzer.daemon_status, default=str).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        server = ThreadingHTTPServer(('0.0.0.0', port), HealthHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f"🩺 Health endpoint: http://localhost:{port}/health")
+        return server
+    
+    def run_daemon(self, recipient_email=None, port=8080):
+        """Stay resident with warm caches and run on the NSE trading schedule"""
+        self.daemon_status = {
+            'status': 'idle',
+            'started_at': self.get_ist_time().isoformat(),
+            'runs_completed': 0,
+            'last_run': None,
+            'last_duration_sec': None,
+            'last_error': None,
+            'next_run': None,
+            'cached_symbols': 0,
+        }
+        self.start_health_server(port)
+        self.provisional_report_path = 'progress.html'
+        
+        while True:
+            # Re-read the calendar each cycle so edits apply without a restart
+            holidays = self.load_holiday_calendar()
+            next_run = self.next_scheduled_run(self.get_ist_time(), holidays)
+            self.daemon_status['next_run'] = next_run.isoformat() if next_run else None
+            if next_run is None:
+                print("⚠️  No trading day found in the next 30 days - check the holiday calendar")
+                time.sleep(3600)
+                continue
+            
+            print(f"⏰ Next run: {next_run.strftime('%d %b %Y, %I:%M %p IST')}")
+            while True:
+                remaining = (next_run - self.get_ist_time()).total_seconds()
+                if remaining <= 0:
+                    break
+                time.sleep(min(remaining, 60))
+            
+            self.daemon_status['status'] = 'running'
+            started = time.monotonic()
+            try:
+                self.generate_complete_report(
+                    send_email_flag=True,
+                    recipient_email=recipient_email,
+                    generate_github_pages=True
+                )
+                self.daemon_status['last_error'] = None
+                self.daemon_status['runs_completed'] += 1
+            except Exception as e:
+                print(f"❌ Scheduled run failed: {e}")
+                self.daemon_status['last_error'] = str(e)
+            
+            self.daemon_status.update({
+                'status': 'idle',
+                'last_run': self.get_ist_time().isoformat(),
+                'last_duration_sec': round(time.monotonic() - started, 1),
+                'cached_symbols': len(self.price_data),
+            })
 
 
 def main():
     """Main execution"""
+    parser = argparse.ArgumentParser(description="NIFTY 50 stock analyzer")
+    parser.add_argument('--daemon', action='store_true',
+                        help="stay resident and run on the NSE trading schedule")
+    parser.add_argument('--port', type=int, default=int(os.environ.get('NIFTY_DAEMON_PORT', 8080)),
+                        help="health/status endpoint port in daemon mode")
+    
+    # What-if rescoring of the last run (no downloads)
+    parser.add_argument('--rescore', action='store_true',
+                        help="rescore the last run's feature matrix and diff against production")
+    parser.add_argument('--features', default=None, help="feature matrix to rescore (default .cache/features.npz)")
+    parser.add_argument('--tech-weight', type=float, default=0.5,
+                        help="technical share of the combined score (fundamental gets the rest)")
+    parser.add_argument('--cutoffs', default='75,55,45,30',
+                        help="STRONG BUY,BUY,HOLD,SELL score cutoffs")
+    parser.add_argument('--mtf-score', action=argparse.BooleanOptionalAction, default=None,
+                        help="include the multi-timeframe component")
+    parser.add_argument('--extended-score', action=argparse.BooleanOptionalAction, default=None,
+                        help="include the ADX/Bollinger/Stochastic components")
+    parser.add_argument('--index-relative-score', action=argparse.BooleanOptionalAction, default=None,
+                        help="include the alpha/relative-strength component")
+    parser.add_argument('--show-all', action='store_true', help="print every stock, not just changes")
+    
+    # Numeric precision
+    parser.add_argument('--precision', choices=PRICE_DTYPES, default=None,
+                        help="storage precision for prices, panels and indicator arrays")
+    parser.add_argument('--verify-precision', action='store_true',
+                        help="analyze in float64, then check float32 storage reproduces the rounded outputs")
+    args = parser.parse_args()
+    
     analyzer = Nifty50CompleteAnalyzer()
+    if args.precision:
+        analyzer.price_dtype = np.dtype(args.precision)
+    
+    if args.verify_precision:
+        analyzer.price_dtype = np.dtype('float64')
+        analyzer.restore_cache_bundle()
+        analyzer.analyze_all_stocks()
+        analyzer.complete_run_journal()
+        analyzer.verify_reduced_precision()
+        return
+    
+    if args.rescore:
+        try:
+            cutoffs = analyzer.validate_cutoffs(args.cutoffs.split(','))
+        except ValueError as e:
+            parser.error(f"--cutoffs: {e}")
+        weights = {'tech_weight': args.tech_weight, 'cutoffs': cutoffs}
+        for key, value in (('use_mtf', args.mtf_score), ('use_extended', args.extended_score),
+                           ('use_index_relative', args.index_relative_score)):
+            if value is not None:
+                weights[key] = value
+        analyzer.run_rescore(args.features, show_all=args.show_all, **weights)
+        return
+    
+    analyzer.restore_cache_bundle()
     
     # Get recipient email from environment variable
     recipient = os.environ.get('RECIPIENT_EMAIL')
@@ -1138,6 +4547,10 @@ def main():
         print("   Please set it to receive email reports")
         recipient = None
     
+    if args.daemon:
+        analyzer.run_daemon(recipient_email=recipient, port=args.port)
+        return
+    
     # Generate report, GitHub Pages HTML, and send email
     analyzer.generate_complete_report(
         send_email_flag=True, 